@@ -0,0 +1,63 @@
+"""status version
+
+Revision ID: 4d7a2b9e6c15
+Revises: 9c3e5f1a7b2d
+Create Date: 2026-10-16 21:02:17.904113
+
+Adds a single row status_version table whose version is incremented by statement level triggers
+on deployed_stream and expected_stream, allowing API processes to detect changes with a single
+primary key lookup. The insert, update and delete triggers read their transition table and only
+bump the version when the statement changed rows, so no-op statements don't queue behind the
+status_version row lock. Requires PostgreSQL 10 or later.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '4d7a2b9e6c15'
+down_revision = '9c3e5f1a7b2d'
+branch_labels = None
+depends_on = None
+
+TABLES = ('deployed_stream', 'expected_stream')
+# trigger event -> transition table holding the changed rows
+EVENTS = (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD'))
+
+
+def upgrade():
+    op.create_table('status_version',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('version', sa.BigInteger(), nullable=False),
+                    sa.PrimaryKeyConstraint('id'),
+                    sa.CheckConstraint('id = 1', name='status_version_single_row')
+                    )
+    op.execute('INSERT INTO status_version (id, version) VALUES (1, 0)')
+    op.execute("""
+        CREATE FUNCTION bump_status_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'TRUNCATE' THEN
+                IF NOT EXISTS (SELECT 1 FROM changed_rows) THEN
+                    RETURN NULL;
+                END IF;
+            END IF;
+            UPDATE status_version SET version = version + 1 WHERE id = 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in TABLES:
+        for event, transition in EVENTS:
+            op.execute('CREATE TRIGGER %s_status_version_%s AFTER %s ON %s REFERENCING %s TABLE AS changed_rows '
+                       'FOR EACH STATEMENT EXECUTE PROCEDURE bump_status_version()' % (
+                           table, event.lower(), event, table, transition))
+        op.execute('CREATE TRIGGER %s_status_version_truncate AFTER TRUNCATE ON %s '
+                   'FOR EACH STATEMENT EXECUTE PROCEDURE bump_status_version()' % (table, table))
+
+
+def downgrade():
+    for table in TABLES:
+        for event in [event for event, _ in EVENTS] + ['TRUNCATE']:
+            op.execute('DROP TRIGGER %s_status_version_%s ON %s' % (table, event.lower(), table))
+    op.execute('DROP FUNCTION bump_status_version()')
+    op.drop_table('status_version')
@@ -0,0 +1,82 @@
+"""partition port_count by collected_time
+
+Revision ID: 9c3e5f1a7b2d
+Revises: 41478f285a90
+Create Date: 2026-10-16 09:12:40.518306
+
+Converts port_count into a table range partitioned by month on collected_time with an index on
+(reference_designator_id, collected_time) in every partition. Partitions are created for all
+existing data and the next three months, later partitions are created (and expired partitions
+dropped) by ooi_status_partitions. Records outside every monthly partition land in port_count_default
+rather than failing the insert. Requires PostgreSQL 11 or later.
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5f1a7b2d'
+down_revision = '41478f285a90'
+branch_labels = None
+depends_on = None
+
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    month timestamp := date_trunc('month', coalesce((SELECT min(collected_time) FROM port_count_unpartitioned),
+                                                    now() at time zone 'utc'));
+BEGIN
+    WHILE month <= date_trunc('month', now() at time zone 'utc') + interval '3 months' LOOP
+        EXECUTE format('CREATE TABLE %I PARTITION OF port_count FOR VALUES FROM (%L) TO (%L)',
+                       to_char(month, '"port_count_y"YYYY"m"MM'), month, month + interval '1 month');
+        month := month + interval '1 month';
+    END LOOP;
+END
+$$
+"""
+
+
+def upgrade():
+    op.execute('ALTER TABLE port_count RENAME TO port_count_unpartitioned')
+    op.execute('ALTER TABLE port_count_unpartitioned RENAME CONSTRAINT port_count_pkey TO port_count_unpartitioned_pkey')
+    op.execute('ALTER TABLE port_count_unpartitioned ALTER COLUMN id DROP DEFAULT')
+    op.execute("""
+        CREATE TABLE port_count (
+            id INTEGER NOT NULL DEFAULT nextval('port_count_id_seq'),
+            reference_designator_id INTEGER NOT NULL REFERENCES reference_designator (id),
+            collected_time TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            byte_count INTEGER,
+            seconds FLOAT,
+            CONSTRAINT port_count_pkey PRIMARY KEY (id, collected_time)
+        ) PARTITION BY RANGE (collected_time)
+    """)
+    op.execute('ALTER SEQUENCE port_count_id_seq OWNED BY port_count.id')
+    op.execute('CREATE INDEX ix_port_count_refdes_collected_time ON port_count (reference_designator_id, collected_time)')
+    op.execute(CREATE_PARTITIONS)
+    op.execute('CREATE TABLE port_count_default PARTITION OF port_count DEFAULT')
+    op.execute("""
+        INSERT INTO port_count (id, reference_designator_id, collected_time, byte_count, seconds)
+        SELECT id, reference_designator_id, collected_time, byte_count, seconds FROM port_count_unpartitioned
+    """)
+    op.execute('DROP TABLE port_count_unpartitioned')
+
+
+def downgrade():
+    op.execute('ALTER TABLE port_count RENAME TO port_count_partitioned')
+    op.execute('ALTER TABLE port_count_partitioned RENAME CONSTRAINT port_count_pkey TO port_count_partitioned_pkey')
+    op.execute('ALTER TABLE port_count_partitioned ALTER COLUMN id DROP DEFAULT')
+    op.execute("""
+        CREATE TABLE port_count (
+            id INTEGER NOT NULL DEFAULT nextval('port_count_id_seq'),
+            reference_designator_id INTEGER NOT NULL REFERENCES reference_designator (id),
+            collected_time TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            byte_count INTEGER,
+            seconds FLOAT,
+            CONSTRAINT port_count_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute('ALTER SEQUENCE port_count_id_seq OWNED BY port_count.id')
+    op.execute("""
+        INSERT INTO port_count (id, reference_designator_id, collected_time, byte_count, seconds)
+        SELECT id, reference_designator_id, collected_time, byte_count, seconds FROM port_count_partitioned
+    """)
+    op.execute('DROP TABLE port_count_partitioned CASCADE')
@@ -0,0 +1,56 @@
+"""status version modified time
+
+Revision ID: b81f4c3d0e27
+Revises: 4d7a2b9e6c15
+Create Date: 2026-10-16 21:24:51.330917
+
+Records the time of the last change to deployed_stream or expected_stream alongside the status
+version, used as the Last-Modified time of the API status responses. The time is taken with
+clock_timestamp() rather than the transaction start time so that a long transaction committing
+after a later change doesn't move Last-Modified backwards.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b81f4c3d0e27'
+down_revision = '4d7a2b9e6c15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('status_version', sa.Column('modified', sa.DateTime(), nullable=False,
+                                              server_default=sa.text("(clock_timestamp() at time zone 'utc')")))
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_status_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'TRUNCATE' THEN
+                IF NOT EXISTS (SELECT 1 FROM changed_rows) THEN
+                    RETURN NULL;
+                END IF;
+            END IF;
+            UPDATE status_version SET version = version + 1, modified = clock_timestamp() at time zone 'utc'
+            WHERE id = 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade():
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_status_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'TRUNCATE' THEN
+                IF NOT EXISTS (SELECT 1 FROM changed_rows) THEN
+                    RETURN NULL;
+                END IF;
+            END IF;
+            UPDATE status_version SET version = version + 1 WHERE id = 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.drop_column('status_version', 'modified')
@@ -0,0 +1,36 @@
+"""status filter indexes
+
+Revision ID: e5c9a1f7d342
+Revises: b81f4c3d0e27
+Create Date: 2026-10-16 22:05:12.640285
+
+Indexes backing the exact, prefix and substring filters of the status API. The varchar_pattern_ops
+btree indexes serve equality and prefix (LIKE 'value%') filters under any collation, the pg_trgm GIN
+indexes serve substring (LIKE '%value%') filters.
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e5c9a1f7d342'
+down_revision = 'b81f4c3d0e27'
+branch_labels = None
+depends_on = None
+
+# method and status have only a handful of distinct values and are not worth indexing
+INDEXED_COLUMNS = [('reference_designator', 'name'), ('expected_stream', 'name')]
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in INDEXED_COLUMNS:
+        op.create_index('ix_%s_%s_pattern' % (table, column), table, [column],
+                        postgresql_ops={column: 'varchar_pattern_ops'})
+        op.create_index('ix_%s_%s_trgm' % (table, column), table, [column],
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    for table, column in INDEXED_COLUMNS:
+        op.drop_index('ix_%s_%s_trgm' % (table, column), table_name=table)
+        op.drop_index('ix_%s_%s_pattern' % (table, column), table_name=table)
@@ -0,0 +1,92 @@
+import datetime
+from collections import namedtuple
+
+ActiveStream = namedtuple('ActiveStream', 'refdes stream method last uid')
+
+
+class ActiveStreamTable(object):
+    """
+    In-memory copy of the active stream set returned by get_active_streams.
+
+    The table keeps the time of the last particle seen for every active stream so that each
+    monitor tick only needs to fetch the streams whose last particle time moved past the
+    watermark (the newest last particle time seen, less a lookback to allow for streams which
+    deliver data behind real time). Last particle times in the future (an instrument with a fast
+    clock) don't move the watermark, otherwise every other stream would fall behind it. Streams
+    delivering data further behind than the lookback, as well as deployments which start or end,
+    are picked up on the next full resync.
+    """
+    def __init__(self, lookback_seconds=3600):
+        self.lookback = datetime.timedelta(seconds=lookback_seconds)
+        self.streams = {}
+        self.watermark = None
+
+    def __len__(self):
+        return len(self.streams)
+
+    @staticmethod
+    def key(record):
+        return record.refdes, record.stream, record.method
+
+    def dump(self):
+        """
+        :return: (list of plain stream tuples, watermark) suitable for pickling
+        """
+        return [tuple(record) for record in self.streams.values()], self.watermark
+
+    def restore(self, records, watermark):
+        self.streams = {}
+        for record in records:
+            record = ActiveStream(*record)
+            self.streams[self.key(record)] = record
+        self.watermark = watermark
+
+    def since(self):
+        """
+        :return: lower bound (exclusive) of StreamMetadatum.last for the next incremental fetch
+        """
+        if self.watermark is None:
+            return None
+        return self.watermark - self.lookback
+
+    def update(self, rows, full=False, now=None):
+        """
+        Merge rows from get_active_streams into the table
+        :param rows: iterable of (StreamMetadatum, elapsed, uid)
+        :param full: True if rows is the complete active set, any stream not present is dropped
+        :param now: current time (UTC), the watermark never moves past it, defaults to utcnow
+        :return: set of keys for streams which are new or whose last particle time changed
+        """
+        if now is None:
+            now = datetime.datetime.utcnow()
+        changed = set()
+        updated = {}
+        for stream_metadata, _, uid in rows:
+            record = ActiveStream(stream_metadata.refdes, stream_metadata.stream, stream_metadata.method,
+                                  stream_metadata.last, uid)
+            key = self.key(record)
+            if self.streams.get(key) != record:
+                changed.add(key)
+            updated[key] = record
+            if record.last <= now and (self.watermark is None or record.last > self.watermark):
+                self.watermark = record.last
+
+        if full:
+            self.streams = updated
+        else:
+            self.streams.update(updated)
+        return changed
+
+    def rows(self, now, keys=None):
+        """
+        Generate rows in the same form as get_active_streams from the table contents
+        :param now: current time, used to compute the elapsed time since the last particle
+        :param keys: restrict the output to these streams, defaults to all streams
+        :return: generator yielding (ActiveStream, elapsed, uid)
+        """
+        if keys is None:
+            keys = list(self.streams)
+        for key in keys:
+            record = self.streams.get(key)
+            if record is not None:
+                yield record, now - record.last, record.uid
@@ -1,45 +1,79 @@
 import json
+import time
 import datetime
+import logging
 
-from logging import getLogger
+from multiprocessing import Process
 from threading import Thread
 
+import click
 from kombu.mixins import ConsumerMixin
 from kombu import Connection, Queue
+from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from ooi_data.postgres.model import PortCount, ReferenceDesignator
+from ooi_data.postgres.model import PortCount
 
-log = getLogger(__name__)
+from ooi_status.config import load_config
+from ooi_status.get_logger import get_logger
+from ooi_status.port_aggregator import PortCountAggregator
+from ooi_status.refdes_cache import ReferenceDesignatorCache
+
+log = get_logger(__name__, logging.INFO)
 
 
 class AmqpStatsClient(ConsumerMixin):
-    def __init__(self, url, queue, engine):
+    """
+    Consume port agent statistics from AMQP and store them as PortCount records.
+
+    Decoded messages are buffered and written with a single bulk insert once batch_size
+    messages have been received or flush_interval seconds have passed since the last write.
+    The whole batch is acknowledged with one multiple-ack only after the insert has been
+    committed, so an unacknowledged message is never lost if the client dies mid-batch.
+    A batch_size of 1 writes and acknowledges every message as it arrives.
+
+    If aggregate_seconds is set, records are instead summed per reference designator into
+    buckets of that width (see PortCountAggregator) and only closed buckets are written.
+    Each message is acknowledged as soon as the bucket it contributed to has been committed,
+    so a later failed write only requeues messages whose data has not been stored.
+
+    If prefetch_count is set the broker will deliver at most that many unacknowledged
+    messages to this client. It should be at least batch_size, or when aggregating, the
+    number of messages expected within aggregate_seconds plus aggregate_grace.
+    """
+    def __init__(self, url, queue, engine, batch_size=1, flush_interval=1.0, prefetch_count=None,
+                 aggregate_seconds=None, aggregate_grace=0):
         self.engine = engine
         self.session_factory = sessionmaker(bind=engine, autocommit=True)
         self.session = self.session_factory()
-        self._refdes_cache = {}
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.prefetch_count = prefetch_count
+        self.aggregator = None
+        if aggregate_seconds:
+            self.aggregator = PortCountAggregator(aggregate_seconds, aggregate_grace)
+        self.refdes_cache = ReferenceDesignatorCache()
+        self._rows = []
+        self._unacked = []
+        self._received = 0
+        self._last_flush = time.time()
         self._queue_name = queue
         self.connection = Connection(url)
         self.queue = Queue(name=self._queue_name, channel=self.connection)
 
-    def _get_or_create_refdes(self, reference_designator):
-        if reference_designator not in self._refdes_cache:
-            refdes = self.session.query(ReferenceDesignator).filter(
-                ReferenceDesignator.name == reference_designator).first()
-            if refdes is None:
-                refdes = ReferenceDesignator(name=reference_designator)
-                self.session.add(refdes)
-                self.session.flush()
-            self._refdes_cache[reference_designator] = refdes
-        return self._refdes_cache[reference_designator]
-
     def get_consumers(self, Consumer, channel):
-        return [
-            Consumer([self.queue], callbacks=[self.on_message])
-        ]
+        consumer = Consumer([self.queue], callbacks=[self.on_message])
+        if self.prefetch_count:
+            consumer.qos(prefetch_count=self.prefetch_count)
+        return [consumer]
 
-    def on_message(self, body, message):
+    @staticmethod
+    def decode(body):
+        """
+        Decode a port agent statistics message
+        :param body: JSON formatted message body
+        :return: (reference designator, collected time, byte count, elapsed seconds)
+        """
         data = json.loads(body)
         bytes_in = data.get('bytes_in', 0)
         bytes_out = data.get('bytes_out', 0)
@@ -51,19 +85,126 @@ class AmqpStatsClient(ConsumerMixin):
         clients = data.get('num_clients', {}).get('client', 0)
         if clients > 0 and adds == 0 and bytes_in != (1.0 * bytes_out / clients):
             log.error('differing in/out rates: %d %d %d', bytes_in, bytes_out, clients)
+        return refdes, collected, bytes_in, elapsed
+
+    def on_message(self, body, message):
+        record = self.decode(body)
+        key = None
+        if self.aggregator is None:
+            self._rows.append(record)
+        else:
+            key = self.aggregator.add(*record)
+        self._unacked.append((message, key))
+        self._received += 1
+        if self._received >= self.batch_size:
+            self.flush()
+
+    def on_iteration(self):
+        if self._unacked and time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all buffered records (and closed aggregation buckets) in a single transaction and
+        acknowledge the corresponding messages. Messages are acknowledged once their data has been
+        committed, so if the write fails all unacknowledged messages are requeued for redelivery.
+        """
+        rows, self._rows = self._rows, []
+        self._received = 0
+        if self.aggregator is not None:
+            rows.extend(self.aggregator.pop_closed())
+        self._last_flush = time.time()
+
+        if rows:
+            try:
+                with self.session.begin():
+                    refdes_ids = self.refdes_cache.get_ids(self.session, (row[0] for row in rows))
+                    values = [{'reference_designator_id': refdes_ids[refdes],
+                               'collected_time': collected,
+                               'byte_count': byte_count,
+                               'seconds': seconds} for refdes, collected, byte_count, seconds in rows]
+                    self.session.execute(PortCount.__table__.insert(), values)
+            except Exception:
+                log.exception('Unable to store %d port count records, requeueing', len(rows))
+                self.refdes_cache.invalidate()
+                if self.aggregator is not None:
+                    self.aggregator.clear()
+                for message, _ in self._unacked:
+                    message.requeue()
+                self._unacked = []
+                return
 
-        with self.session.begin():
-            refdes_obj = self._get_or_create_refdes(refdes)
-            pc = PortCount()
-            pc.reference_designator = refdes_obj
-            pc.collected_time = collected
-            pc.byte_count = bytes_in
-            pc.seconds = elapsed
-            self.session.add(pc)
-        message.ack()
+        # acknowledge the leading run of committed messages with a single multiple-ack and any
+        # committed messages behind a still open bucket individually
+        index = 0
+        for message, key in self._unacked:
+            if key is not None and self.aggregator.is_open(key):
+                break
+            index += 1
+        if index:
+            self._unacked[index - 1][0].ack(multiple=True)
+
+        unacked = []
+        for message, key in self._unacked[index:]:
+            if self.aggregator.is_open(key):
+                unacked.append((message, key))
+            else:
+                message.ack()
+        self._unacked = unacked
 
     def start_thread(self):
         t = Thread(target=self.run)
         t.setDaemon(True)
         t.start()
         return t
+
+
+def run_worker(config, worker_id):
+    """
+    Run a single ingest worker until interrupted. Each worker creates its own database engine,
+    session and AMQP connection so that it can be run in a separate process.
+    """
+    engine = create_engine(config['MONITOR_URL'])
+    client = AmqpStatsClient(config['AMQP_URL'], config['AMQP_QUEUE'], engine,
+                             batch_size=config['AMQP_BATCH_SIZE'],
+                             flush_interval=config['AMQP_FLUSH_INTERVAL'],
+                             prefetch_count=config['AMQP_PREFETCH_COUNT'],
+                             aggregate_seconds=config['AMQP_AGGREGATE_SECONDS'],
+                             aggregate_grace=config['AMQP_AGGREGATE_GRACE'])
+    log.info('Starting ingest worker %d', worker_id)
+    client.run()
+
+
+@click.command()
+@click.option('--workers', type=int, help='Number of consumer workers (default AMQP_WORKERS)')
+@click.option('--prefetch', type=int, help='Per-worker prefetch count (default AMQP_PREFETCH_COUNT)')
+@click.option('--threads', is_flag=True, help='Run workers as threads instead of processes')
+def main(workers, prefetch, threads):
+    config = load_config()
+    if workers is not None:
+        config['AMQP_WORKERS'] = workers
+    if prefetch is not None:
+        config['AMQP_PREFETCH_COUNT'] = prefetch
+
+    workers = max(config['AMQP_WORKERS'], 1)
+    log.info('Starting %d ingest workers on queue %r (prefetch %r)',
+             workers, config['AMQP_QUEUE'], config['AMQP_PREFETCH_COUNT'])
+
+    if workers == 1:
+        run_worker(config, 0)
+        return
+
+    worker_class = Thread if threads else Process
+    children = []
+    for worker_id in range(workers):
+        child = worker_class(target=run_worker, args=(config, worker_id), name='ingest-%d' % worker_id)
+        child.daemon = True
+        child.start()
+        children.append(child)
+
+    for child in children:
+        child.join()
+
+
+if __name__ == '__main__':
+    main()
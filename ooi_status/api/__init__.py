@@ -52,5 +52,12 @@ MonitorBase.query = app.session.query_property()
 if using_gevent:
     app.engine.pool._use_threadlocal = True
 
+from ooi_status.api.cache import ResponseCache, StatusVersion
+
+app.status_version = StatusVersion(app.config.get('API_CACHE_VERSION_TTL', 1.0))
+app.response_cache = None
+if app.config.get('API_CACHE_SIZE'):
+    app.response_cache = ResponseCache(app.config['API_CACHE_SIZE'], app.status_version)
+
 
 import ooi_status.api.views
@@ -0,0 +1,138 @@
+import functools
+import time
+
+from cachetools import LRUCache
+from flask import request
+from sqlalchemy import text
+
+STATUS_VERSION_SQL = text('SELECT version, modified FROM status_version WHERE id = 1')
+# response headers stored with a cached response body
+CACHED_HEADERS = ('Link',)
+
+
+class StatusVersion(object):
+    """
+    The status version and the time of the last change to deployed_stream or expected_stream.
+
+    Both are maintained by a trigger on every change to those tables. They are read from the
+    database at most once every ttl seconds, so within a process they may be up to ttl seconds stale.
+    """
+    def __init__(self, ttl=1.0):
+        self.ttl = ttl
+        self.version = None
+        self.modified = None
+        self.checked = None
+
+    def get(self, session):
+        """
+        :return: (version, modified), re-reading them from the database if the last read has expired
+        """
+        now = time.time()
+        if self.checked is None or now - self.checked >= self.ttl:
+            self.version, self.modified = session.execute(STATUS_VERSION_SQL).first()
+            self.checked = now
+        return self.version, self.modified
+
+    def expire(self):
+        self.checked = None
+
+
+class ResponseCache(object):
+    """
+    Cache of serialized API responses, valid for a single status version.
+
+    The whole cache is discarded when the status version changes, so a cached response is at most
+    the status version ttl stale. The cache is held per process, each gunicorn worker keeps its own copy.
+    """
+    def __init__(self, maxsize=256, status_version=None):
+        self.responses = LRUCache(maxsize=maxsize)
+        self.status_version = status_version or StatusVersion()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_version(self, session):
+        """
+        :return: the current status version, discarding all cached responses if it has changed
+        """
+        version, _ = self.status_version.get(session)
+        if version != self.version:
+            self.responses.clear()
+            self.version = version
+        return version
+
+    def get(self, key):
+        data = self.responses.get(key)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def set(self, key, data):
+        self.responses[key] = data
+
+    def clear(self):
+        self.responses.clear()
+        self.status_version.expire()
+
+
+def cached_response(app, cache):
+    """
+    Decorator caching the serialized JSON body (and Link header) of a view, keyed on the request path
+    and query arguments. Only successful responses are cached.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def decorated(*args, **kwargs):
+            if cache is None:
+                return view(*args, **kwargs)
+
+            # the version is read before the view runs, so a response is never cached under an older
+            # version than the data it holds
+            cache.get_version(app.session)
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            cached = cache.get(key)
+            if cached is not None:
+                data, headers = cached
+                return app.response_class(data, mimetype='application/json', headers=headers)
+
+            response = view(*args, **kwargs)
+            if response.status_code == 200:
+                headers = [(name, value) for name, value in response.headers if name in CACHED_HEADERS]
+                cache.set(key, (response.get_data(), headers))
+            return response
+        return decorated
+    return decorator
+
+
+def conditional_response(app, status_version):
+    """
+    Decorator adding an ETag (the status version) and Last-Modified (the time of the last status
+    change) to successful responses and answering matching If-None-Match / If-Modified-Since
+    requests with 304 Not Modified without running the view.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def decorated(*args, **kwargs):
+            version, modified = status_version.get(app.session)
+            etag = 'status-%d' % version
+            modified = modified.replace(microsecond=0)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and modified <= since.replace(tzinfo=None)
+
+            if not_modified:
+                response = app.response_class(status=304)
+            else:
+                response = view(*args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = modified
+            return response
+        return decorated
+    return decorator
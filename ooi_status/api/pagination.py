@@ -0,0 +1,83 @@
+import base64
+import json
+
+import six
+import six.moves.http_client as http_client
+from flask import request, url_for
+from werkzeug.exceptions import abort
+
+# types of the values in a cursor sort key
+ID = six.integer_types
+NAME = six.string_types
+
+
+def encode_cursor(key):
+    """
+    :param key: list of the sort key values of the last item on a page
+    :return: opaque cursor string
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(key), separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, key_types):
+    """
+    :param cursor: cursor string produced by encode_cursor
+    :param key_types: sequence of the types of each value in the sort key (ID or NAME)
+    :return: list of sort key values
+    :raises ValueError: if the cursor is not valid
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(str(cursor)).decode('utf-8'))
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('invalid cursor')
+    if not isinstance(key, list) or len(key) != len(key_types):
+        raise ValueError('invalid cursor')
+    for value, types in zip(key, key_types):
+        # bool is a subclass of int
+        if not isinstance(value, types) or isinstance(value, bool):
+            raise ValueError('invalid cursor')
+    return key
+
+
+def get_page_args(app, key_types):
+    """
+    Read the limit and cursor query arguments. Results are paginated if either is supplied or if
+    API_PAGE_SIZE is set. Aborts with 400 Bad Request if either argument is invalid.
+    :param key_types: types of the values in the sort key, see decode_cursor
+    :return: (page size or None if not paginated, decoded cursor or None)
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    max_limit = app.config.get('API_MAX_PAGE_SIZE')
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            abort(http_client.BAD_REQUEST)
+        if limit < 1:
+            abort(http_client.BAD_REQUEST)
+    elif cursor is not None or app.config.get('API_PAGE_SIZE'):
+        limit = app.config.get('API_PAGE_SIZE') or max_limit
+
+    if limit is not None and max_limit:
+        limit = min(limit, max_limit)
+
+    if cursor is not None:
+        try:
+            cursor = decode_cursor(cursor, key_types)
+        except ValueError:
+            abort(http_client.BAD_REQUEST)
+    return limit, cursor
+
+
+def add_next_link(response, cursor):
+    """
+    Add a Link header pointing at the next page to the response, if there is one
+    """
+    if cursor is not None:
+        args = request.args.to_dict()
+        args['cursor'] = cursor
+        args.update(request.view_args or {})
+        response.headers['Link'] = '<%s>; rel="next"' % url_for(request.endpoint, **args)
+    return response
@@ -0,0 +1,76 @@
+import json
+import types
+
+from flask import stream_with_context
+
+# size in characters of the chunks written to the client
+CHUNK_SIZE = 8192
+# yielded by iterencode_object after each array item
+ITEM_BOUNDARY = None
+
+
+def iterencode_object(fields, encoder):
+    """
+    Incrementally encode a JSON object. Generator values are encoded as JSON arrays one item at a
+    time, so only a single item needs to be held in memory.
+    :param fields: list of (name, value)
+    :param encoder: JSONEncoder instance used to encode each value or item
+    :return: generator yielding JSON text fragments, and ITEM_BOUNDARY after each array item
+    """
+    yield '{'
+    for index, (name, value) in enumerate(fields):
+        if index:
+            yield ','
+        yield json.dumps(name) + ':'
+        if isinstance(value, types.GeneratorType):
+            yield '['
+            for item_index, item in enumerate(value):
+                if item_index:
+                    yield ','
+                for chunk in encoder.iterencode(item):
+                    yield chunk
+                yield ITEM_BOUNDARY
+            yield ']'
+        else:
+            for chunk in encoder.iterencode(value):
+                yield chunk
+    yield '}'
+
+
+def buffered(fragments, size=CHUNK_SIZE):
+    """
+    Join small text fragments into chunks of at least size characters. The text up to the end of
+    the first array item is sent immediately, so the client receives the first item as soon as it
+    has been produced.
+    """
+    buf = []
+    length = 0
+    first = True
+    for fragment in fragments:
+        if fragment is ITEM_BOUNDARY:
+            if not first or not buf:
+                continue
+            first = False
+        else:
+            buf.append(fragment)
+            length += len(fragment)
+            if length < size:
+                continue
+        yield ''.join(buf)
+        buf = []
+        length = 0
+    if buf:
+        yield ''.join(buf)
+
+
+def streamed_json(app, fields):
+    """
+    Build a response streaming a JSON object encoded with the application JSON encoder (StatusJsonEncoder)
+    as it is produced. The request context (and database sessions) remain available until the last
+    chunk is sent. Errors raised after the first chunk cannot change the response status and
+    truncate the body instead.
+    :param fields: list of (name, value), generator values are streamed as arrays
+    """
+    encoder = app.json_encoder(separators=(',', ':'))
+    body = buffered(iterencode_object(fields, encoder))
+    return app.response_class(stream_with_context(body), mimetype='application/json')
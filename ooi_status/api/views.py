@@ -5,8 +5,11 @@ from ooi_data.postgres.model import ExpectedStream, DeployedStream
 from werkzeug.exceptions import abort
 
 from ..api import app
-from ..metadata_queries import find_instrument_availability
-from ..queries import (get_status_by_instrument, get_status_by_stream,
+from .cache import cached_response, conditional_response
+from .pagination import ID, NAME, add_next_link, encode_cursor, get_page_args
+from .streaming import streamed_json
+from ..metadata_queries import find_instrument_availability, iter_instrument_availability
+from ..queries import (FILTER_MATCH_MODES, get_instrument_page, get_status_by_instrument, get_status_by_stream,
                        get_status_by_stream_id, get_status_by_refdes_id)
 
 
@@ -16,6 +19,20 @@ def shutdown_session(exception=None):
     app.metadata_session.remove()
 
 
+def clear_response_cache():
+    # changes are picked up through the status version, clear now so this process never serves stale results
+    app.status_version.expire()
+    if app.response_cache is not None:
+        app.response_cache.clear()
+
+
+def get_match():
+    match = request.args.get('match', 'substring')
+    if match not in FILTER_MATCH_MODES:
+        abort(http_client.BAD_REQUEST)
+    return match
+
+
 @app.route('/available/<refdes>', methods=['GET'])
 def available(refdes):
     filter_method = request.args.get('method')
@@ -27,6 +44,9 @@ def available(refdes):
         start_time = parse(start_time)
     if stop_time is not None:
         stop_time = parse(stop_time)
+    if app.config.get('API_STREAM_RESPONSES'):
+        return streamed_json(app, [('availability', iter_instrument_availability(
+            app.metadata_session, refdes, filter_method, filter_stream, lower_bound=start_time, upper_bound=stop_time))])
     return jsonify({'availability': find_instrument_availability(
         app.metadata_session, refdes, filter_method, filter_stream, lower_bound=start_time, upper_bound=stop_time)})
 
@@ -43,7 +63,20 @@ def expected():
     if filter_stream:
         expected_streams = expected_streams.filter(ExpectedStream.name == filter_stream)
 
-    return jsonify({'expected_streams': [e.as_dict() for e in expected_streams]})
+    limit, after = get_page_args(app, (ID,))
+    if limit is None:
+        if app.config.get('API_STREAM_RESPONSES'):
+            return streamed_json(app, [('expected_streams', (e.as_dict() for e in expected_streams.yield_per(500)))])
+        return jsonify({'expected_streams': [e.as_dict() for e in expected_streams]})
+
+    expected_streams = expected_streams.order_by(ExpectedStream.id)
+    if after is not None:
+        expected_streams = expected_streams.filter(ExpectedStream.id > after[0])
+    expected_streams = expected_streams.limit(limit + 1).all()
+
+    cursor = encode_cursor([expected_streams[limit - 1].id]) if len(expected_streams) > limit else None
+    response = jsonify({'expected_streams': [e.as_dict() for e in expected_streams[:limit]], 'next': cursor})
+    return add_next_link(response, cursor)
 
 
 @app.route('/expected/<int:expected_id>', methods=['GET'])
@@ -73,6 +106,7 @@ def update_expected_by_id(expected_id):
     if expected_stream:
         patch(expected_stream, request.json)
         app.session.commit()
+        clear_response_cache()
         return jsonify(expected_stream.as_dict())
 
     abort(http_client.NOT_FOUND)
@@ -104,19 +138,31 @@ def update_deployed_by_id(deployed_id):
     if deployed_stream:
         patch(deployed_stream, request.json)
         app.session.commit()
+        clear_response_cache()
         return jsonify(deployed_stream.as_dict())
 
     abort(http_client.NOT_FOUND)
 
 
 @app.route('/stream')
+@conditional_response(app, app.status_version)
+@cached_response(app, app.response_cache)
 def get_streams():
     filter_status = request.args.get('status')
     filter_refdes = request.args.get('refdes')
     filter_method = request.args.get('method')
     filter_stream = request.args.get('stream')
+    match = get_match()
 
-    return jsonify(get_status_by_stream(app.session, filter_refdes, filter_method, filter_stream, filter_status))
+    limit, after = get_page_args(app, (NAME, NAME, NAME))
+    status = get_status_by_stream(app.session, filter_refdes, filter_method, filter_stream, filter_status,
+                                  after=after, limit=limit, match=match)
+    if limit is None:
+        return jsonify(status)
+
+    cursor = encode_cursor(status['next']) if status['next'] else None
+    status['next'] = cursor
+    return add_next_link(jsonify(status), cursor)
 
 
 @app.route('/stream/<int:deployed_id>')
@@ -129,14 +175,29 @@ def get_stream(deployed_id):
 
 
 @app.route('/instrument')
+@conditional_response(app, app.status_version)
+@cached_response(app, app.response_cache)
 def get_instruments():
     filter_status = request.args.get('status')
     filter_refdes = request.args.get('refdes')
     filter_method = request.args.get('method')
     filter_stream = request.args.get('stream')
+    match = get_match()
+
+    limit, after = get_page_args(app, (NAME,))
+    if limit is None:
+        return jsonify(get_status_by_instrument(app.session, filter_refdes=filter_refdes, filter_method=filter_method,
+                                                filter_stream=filter_stream, filter_status=filter_status, match=match))
 
-    return jsonify(get_status_by_instrument(app.session, filter_refdes=filter_refdes, filter_method=filter_method,
-                                            filter_stream=filter_stream, filter_status=filter_status))
+    # the unpaginated response is keyed by reference designator, a page wraps it with the next cursor
+    names, next_name = get_instrument_page(app.session, filter_refdes=filter_refdes, filter_method=filter_method,
+                                           filter_stream=filter_stream, filter_status=filter_status,
+                                           after=after[0] if after else None, limit=limit, match=match)
+    status = get_status_by_instrument(app.session, filter_refdes=filter_refdes, filter_method=filter_method,
+                                      filter_stream=filter_stream, filter_status=filter_status, refdes_names=names,
+                                      match=match)
+    cursor = encode_cursor([next_name]) if next_name else None
+    return add_next_link(jsonify({'instruments': status, 'next': cursor}), cursor)
 
 
 @app.route('/instrument/<int:refdes_id>')
@@ -150,6 +211,7 @@ def disable_by_id(deployed_id):
     if deployed:
         deployed.disable()
         app.session.commit()
+        clear_response_cache()
 
     return jsonify(get_status_by_stream_id(app.session, deployed_id))
 
@@ -160,6 +222,7 @@ def enable_by_id(deployed_id):
     if deployed:
         deployed.enable()
         app.session.commit()
+        clear_response_cache()
 
     return jsonify(get_status_by_stream_id(app.session, deployed_id))
 
@@ -170,6 +233,7 @@ def disable_by_refdes(refdes):
     for each in deployed:
         each.disable()
     app.session.commit()
+    clear_response_cache()
 
     return jsonify(get_status_by_instrument(app.session, filter_refdes=refdes))
 
@@ -180,5 +244,6 @@ def enable_by_refdes(refdes):
     for each in deployed:
         each.enable()
     app.session.commit()
+    clear_response_cache()
 
     return jsonify(get_status_by_instrument(app.session, filter_refdes=refdes))
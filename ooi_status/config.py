@@ -0,0 +1,17 @@
+import os
+
+from flask import Config
+
+here = os.path.dirname(__file__)
+
+
+def load_config():
+    """
+    Load the default settings, overridden by the file named in OOISTATUS_SETTINGS (if set)
+    :return: flask Config object
+    """
+    config = Config(here)
+    config.from_object('ooi_status.default_settings')
+    if 'OOISTATUS_SETTINGS' in os.environ:
+        config.from_envvar('OOISTATUS_SETTINGS')
+    return config
@@ -5,10 +5,102 @@ METADATA_URL = 'postgresql+psycopg2://awips@/metadata'
 # AMQP
 AMQP_URL = 'amqp://localhost'
 AMQP_QUEUE = 'port_agent_stats'
+# number of port count messages received between writes (when aggregating, between checks for closed buckets)
+AMQP_BATCH_SIZE = 100
+# maximum number of seconds a partial batch is held before being written
+AMQP_FLUSH_INTERVAL = 5.0
+# number of ooi_status_ingest consumer workers, each with its own connection and session
+AMQP_WORKERS = 1
+# width in seconds of the per-refdes buckets port counts are summed into before being written
+# (None writes every message as a separate record)
+AMQP_AGGREGATE_SECONDS = None
+# seconds of message time to wait past the end of a bucket for late messages before writing it
+AMQP_AGGREGATE_GRACE = 30
+# maximum unacknowledged messages delivered to each worker (None for broker default)
+# when aggregating, messages stay unacknowledged for up to AMQP_AGGREGATE_SECONDS + AMQP_AGGREGATE_GRACE, which
+# caps each worker at AMQP_PREFETCH_COUNT / (AMQP_AGGREGATE_SECONDS + AMQP_AGGREGATE_GRACE) messages per second
+# (about 55/s for 5000 with 60 + 30 seconds), so size this for the peak message rate
+AMQP_PREFETCH_COUNT = 5000
+
+# STATUS MONITOR
+# only fetch streams which have received new data each tick, re-evaluating the rest from memory
+INCREMENTAL_CHECK = True
+# seconds between full reloads of the active stream set when INCREMENTAL_CHECK is enabled
+FULL_RESYNC_SECONDS = 900
+# streams whose data arrives more than this many seconds behind the newest data wait for the next full resync
+INCREMENTAL_LOOKBACK_SECONDS = 3600
+# evaluate stream status with numpy over all streams at once, only loading changed streams through the ORM
+VECTORIZED_CHECK = True
+# seconds between reloads of the in-memory deployed stream index (also reloaded on every full resync)
+DEPLOYED_INDEX_REFRESH_SECONDS = 300
+# number of shards reference designators are split into between monitor instances sharing MONITOR_URL
+# (0 to disable sharding, only a single monitor instance may then be run). Must be equal on all instances.
+MONITOR_SHARDS = 0
+# maximum number of concurrently running sharded monitor instances
+MONITOR_MAX_INSTANCES = 16
+# file the in-memory stream state is saved to every SNAPSHOT_INTERVAL seconds and restored from on start
+# (None to disable). Requires INCREMENTAL_CHECK.
+SNAPSHOT_PATH = None
+SNAPSHOT_INTERVAL = 300
+# snapshots older than this many seconds are ignored on start
+SNAPSHOT_MAX_AGE = 3600
+# seconds late a job may start before the run is counted as missed (missed runs are coalesced into one)
+SCHEDULER_MISFIRE_GRACE_SECONDS = 30
+# consecutive check_all runs longer than the check interval before the interval is stretched
+CHECK_OVERRUN_LIMIT = 3
+# maximum stretched check_all interval in seconds
+CHECK_MAX_INTERVAL = 600
+# seconds between logging of per-job lag, duration and skip counts
+SCHEDULER_STATS_SECONDS = 600
+
+# PORT COUNT DOWNSAMPLING
+# (resolution, age in hours) - port counts older than the age are rolled up to one record per
+# reference designator per minute/hour/day, until they reach the age of the next tier
+PORT_COUNT_TIERS = [('minute', 24), ('hour', 24 * 7), ('day', 24 * 90)]
+# days after which port counts are deleted (None to keep daily records forever)
+PORT_COUNT_RETENTION_DAYS = None
+# hourly port count job: 'tiered' (PORT_COUNT_TIERS, in the database) or 'pandas' (resample_count_data_hourly)
+PORT_COUNT_RESAMPLER = 'tiered'
+# set once port_count is partitioned by month (alembic revision 9c3e5f1a7b2d, requires PostgreSQL 11 or later),
+# the monitor then creates partitions PORT_COUNT_PARTITION_MONTHS_AHEAD months in advance and drops partitions
+# past PORT_COUNT_RETENTION_DAYS instead of deleting expired records
+PORT_COUNT_PARTITIONED = False
+PORT_COUNT_PARTITION_MONTHS_AHEAD = 3
+# window resampled by the pandas resampler, from RESAMPLE_WINDOW_END_HOURS to RESAMPLE_WINDOW_START_HOURS ago
+RESAMPLE_WINDOW_START_HOURS = 1
+RESAMPLE_WINDOW_END_HOURS = 2
+# number of worker processes the pandas resampler shards reference designators across
+RESAMPLE_PROCESSES = 4
 
 # UFRAME STATUS NOTIFIER
 NOTIFY_URL_ROOT = 'http://localhost'
 NOTIFY_URL_PORT = 12587
+# maximum number of concurrent requests to the events API
+NOTIFY_WORKERS = 8
+# (connect, read) timeout in seconds for each events API request
+NOTIFY_TIMEOUT = (5, 30)
+# number of delivered/failed updates committed per transaction
+NOTIFY_COMMIT_BATCH_SIZE = 50
+# consecutive failed requests before the events API circuit breaker opens
+NOTIFY_BREAKER_THRESHOLD = 3
+# seconds before the first probe of an open breaker, doubled after each failed probe up to the maximum
+NOTIFY_BREAKER_BASE_DELAY = 30
+NOTIFY_BREAKER_MAX_DELAY = 900
+# collapse pending updates superseded by a later update for the same asset and stream before delivery
+# None: deliver every update, 'latest': keep only the latest, 'summary': keep the latest and note the number dropped
+NOTIFY_COALESCE = 'latest'
+
+# HTTP API
+# number of serialized /instrument and /stream responses cached per API worker process (0 to disable)
+API_CACHE_SIZE = 256
+# seconds between checks of the status version, cached responses and ETags may be this stale
+API_CACHE_VERSION_TTL = 1.0
+# stream /available and unpaginated /expected responses to the client as they are encoded
+API_STREAM_RESPONSES = True
+# default page size of /stream, /instrument and /expected (None returns all results unless limit is given)
+API_PAGE_SIZE = None
+# maximum page size a client may request with limit
+API_MAX_PAGE_SIZE = 1000
 
 # Tool Tip Text Associated with data availability display
 DATA_NOT_EXPECTED = 'Not Expected'
@@ -1,21 +1,121 @@
 import logging
+import threading
+import time
+from collections import OrderedDict
+
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 
 from ooi_status.get_logger import get_logger
 
 log = get_logger(__name__, logging.INFO)
 
 
+class CircuitBreaker(object):
+    """
+    Circuit breaker guarding a single remote endpoint.
+
+    While closed, requests are allowed and consecutive failures are counted. Once failure_threshold
+    consecutive failures are seen the breaker opens and rejects all requests until its backoff delay
+    has passed. It then becomes half-open and allows a single probe: success closes the breaker,
+    failure re-opens it with the delay doubled (up to max_delay).
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=3, base_delay=30, max_delay=900):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.backoff_level = 0
+        self.retry_time = None
+        self.times_opened = 0
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def closed(self):
+        return self.state == self.CLOSED
+
+    def allow(self, now=None):
+        """
+        :return: True if a request may be made now
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if now >= self.retry_time:
+                # allow a single probe, if no outcome is ever recorded allow another after base_delay
+                self.state = self.HALF_OPEN
+                self.retry_time = now + self.base_delay
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.backoff_level = 0
+            self.retry_time = None
+            self.state = self.CLOSED
+
+    def record_failure(self, now=None):
+        if now is None:
+            now = time.time()
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and
+                                                self.consecutive_failures >= self.failure_threshold):
+                delay = min(self.base_delay * 2 ** self.backoff_level, self.max_delay)
+                self.backoff_level += 1
+                self.times_opened += 1
+                self.retry_time = now + delay
+                self.state = self.OPEN
+
+    def as_dict(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'retry_time': self.retry_time,
+            'times_opened': self.times_opened,
+            'successes': self.successes,
+            'failures': self.failures,
+            'rejected': self.rejected,
+        }
+
+
 class EventNotifier(object):
     """
     Status Event Notifier service - creates status events based on status changes
+
+    Events are posted over a pooled keep-alive HTTP session with at most max_workers requests in flight.
+    Connection failures and server errors trip a circuit breaker for the events endpoint, while it is
+    open a delivery pass costs at most a single probe request.
     """
 
-    def __init__(self, session, base_url, query_port=12587):
+    def __init__(self, session, base_url, query_port=12587, max_workers=8, timeout=None, breaker=None):
         self.session = session
         self.base_url = '%s:%d/' % (base_url, query_port)
         self.query_url = '%s:%d/status/query' % (base_url, query_port)
         self.post_url = '%s:%d/events/postto' % (base_url, query_port)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
 
     def post_event(self, uid, body):
         """
@@ -26,6 +126,78 @@ class EventNotifier(object):
         """
         url = '%s/%s' % (self.post_url, uid)
         log.debug('POST: %s: %r', url, body)
-        r = requests.post(url, json=body)
+        r = self.http.post(url, json=body, timeout=self.timeout)
         log.debug('RESPONSE: (%d) %r', r.status_code, r.content)
         return r
+
+    def _post(self, uid, key, body):
+        """
+        Post a single event and record the outcome with the circuit breaker
+        :return: (key, response, exception)
+        """
+        try:
+            response = self.post_event(uid, body)
+        except requests.exceptions.RequestException as e:
+            self.breaker.record_failure()
+            return key, None, e
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return key, response, None
+
+    def _post_chain(self, uid, chain):
+        """
+        Post all events for a single asset in order, stopping at the first event which should be
+        retried (connection failure or server error) so later events are never delivered before it
+        """
+        results = []
+        for key, body in chain:
+            if not self.breaker.allow():
+                break
+            key, response, error = self._post(uid, key, body)
+            results.append((key, response, error))
+            if error is not None or response.status_code >= 500:
+                break
+        return results
+
+    def post_events(self, events):
+        """
+        Post many events concurrently. Events for the same asset are posted sequentially in the
+        order supplied, events for different assets are posted in parallel. If the circuit breaker
+        is not closed the first event is sent alone as a probe and the remaining events are only
+        posted if it succeeds.
+        :param events: iterable of (key, asset uid, body)
+        :return: generator yielding (key, response, exception) as responses arrive, where exactly one
+                 of response or exception is None. Events not attempted because an earlier event for
+                 the same asset failed, or because the breaker is open, are not yielded.
+        """
+        chains = OrderedDict()
+        for key, uid, body in events:
+            chains.setdefault(uid, []).append((key, body))
+
+        if not chains:
+            return
+
+        if not self.breaker.closed:
+            if not self.breaker.allow():
+                log.warning('Events API circuit breaker open, skipping delivery: %r', self.breaker.as_dict())
+                return
+            uid, chain = next(iter(chains.items()))
+            key, body = chain.pop(0)
+            result = self._post(uid, key, body)
+            yield result
+            if not self.breaker.closed:
+                log.warning('Events API probe failed: %r', self.breaker.as_dict())
+                return
+            if not chain:
+                del chains[uid]
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = [executor.submit(self._post_chain, uid, chain) for uid, chain in chains.items()]
+            for future in as_completed(futures):
+                for result in future.result():
+                    yield result
+        finally:
+            executor.shutdown(wait=True)
@@ -231,6 +231,21 @@ def find_instrument_availability(session, refdes, method=None, stream=None, lowe
     :param upper_bound: datetime object representing the upper time bound of this query
     :return: visavail.js compatible representation of the data availability for this query
     """
+    return list(iter_instrument_availability(session, refdes, method=method, stream=stream,
+                                             lower_bound=lower_bound, upper_bound=upper_bound))
+
+
+def iter_instrument_availability(session, refdes, method=None, stream=None, lower_bound=None, upper_bound=None):
+    """
+    Generator equivalent of find_instrument_availability, yielding each measure as soon as its spans are computed
+    :param session: sqlalchemy session object
+    :param refdes: Instrument reference designator
+    :param method: stream delivery method
+    :param stream: stream name
+    :param lower_bound: datetime object representing the lower time bound of this query
+    :param upper_bound: datetime object representing the upper time bound of this query
+    :return: generator yielding visavail.js compatible measures (deployments first, then each stream)
+    """
     subsite, node, sensor = refdes.split('-', 2)
     now = datetime.datetime.utcnow()
     if upper_bound is None or upper_bound > now:
@@ -239,7 +254,6 @@ def find_instrument_availability(session, refdes, method=None, stream=None, lowe
     if lower_bound is None:
         lower_bound = session.query(func.min(model.Xdeployment.eventstarttime).label('first')).first().first
 
-    avail = []
     deploy_data = []
     categories = {}
 
@@ -263,8 +277,7 @@ def find_instrument_availability(session, refdes, method=None, stream=None, lowe
             categories[name] = {'color': ODD_DEPLOYMENT}
 
     if deploy_data:
-        avail.append({'measure': 'Deployments', 'data': deploy_data,
-                      'categories': categories})
+        yield {'measure': 'Deployments', 'data': deploy_data, 'categories': categories}
 
         # update bounds based on deployment data
         deployment_lower_bound = min((x[0] for x in deploy_data))
@@ -301,19 +314,17 @@ def find_instrument_availability(session, refdes, method=None, stream=None, lowe
         gaps = find_data_spans(session, subsite, node, sensor, row.method, row.stream, lower_bound, upper_bound)
         gaps = filter_spans(gaps, deploy_data)
         if gaps:
-            avail.append({
+            yield {
                 'measure': '%s %s' % (row.method, row.stream),
                 'data': gaps,
                 'categories': data_categories
-            })
+            }
         else:
-            avail.append({
+            yield {
                 'measure': '%s %s' % (row.method, row.stream),
                 'data': [(lower_bound, NOT_EXPECTED, lower_bound)],
                 'categories': data_categories
-            })
-
-    return avail
+            }
 
 
 def get_all_streams(session):
@@ -325,18 +336,15 @@ def get_all_streams(session):
         yield row.refdes, row.method, row.stream, row.count, row.stop
 
 
-def get_active_streams(session):
+def get_active_streams(session, since=None):
     """
     Return all streams which are within an active deployment
     :param session: sqlalchemy session object
+    :param since: if supplied, only return streams which have received data after this time
     :return: (StreamMetadatum, TimeDelta(since last particle), String(Asset UID))
     """
     now = datetime.datetime.utcnow()
-    for sm, assetid, uid in session.query(
-        model.StreamMetadatum,
-        model.Xdeployment.sassetid,
-        model.Xasset.uid
-    ).filter(
+    filters = [
         model.StreamMetadatum.subsite == model.Xdeployment.subsite,
         model.StreamMetadatum.node == model.Xdeployment.node,
         model.StreamMetadatum.sensor == model.Xdeployment.sensor,
@@ -346,7 +354,15 @@ def get_active_streams(session):
             model.Xdeployment.eventstoptime.is_(None),
             model.Xdeployment.eventstoptime > now
         )
-    ):
+    ]
+    if since is not None:
+        filters.append(model.StreamMetadatum.last > since)
+
+    for sm, assetid, uid in session.query(
+        model.StreamMetadatum,
+        model.Xdeployment.sassetid,
+        model.Xasset.uid
+    ).filter(*filters):
         yield sm, now - sm.last, uid
 
 
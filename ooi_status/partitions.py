@@ -0,0 +1,166 @@
+import datetime
+import logging
+import re
+
+import click
+from sqlalchemy import create_engine, text
+
+from ooi_status.config import load_config
+from ooi_status.get_logger import get_logger
+
+log = get_logger(__name__, logging.INFO)
+
+PARENT_TABLE = 'port_count'
+DEFAULT_PARTITION = 'port_count_default'
+PARTITION_NAME = 'port_count_y%04dm%02d'
+PARTITION_PATTERN = re.compile(r'^port_count_y(\d{4})m(\d{2})$')
+
+CHILD_PARTITIONS_SQL = text("""
+SELECT child.relname FROM pg_inherits
+JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+WHERE parent.relname = :parent
+""")
+
+PARTITIONED_SQL = text("SELECT relkind = 'p' FROM pg_class WHERE relname = :parent")
+
+
+def month_start(dt):
+    return datetime.datetime(dt.year, dt.month, 1)
+
+
+def add_months(dt, months):
+    """
+    :return: the first day of the month the given number of months after dt
+    """
+    index = dt.year * 12 + dt.month - 1 + months
+    return datetime.datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return PARTITION_NAME % (month.year, month.month)
+
+
+def partition_month(name):
+    """
+    :return: start of the month covered by the named partition or None if it is not a monthly partition
+    """
+    match = PARTITION_PATTERN.match(name)
+    if match:
+        return datetime.datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+def get_child_tables(conn):
+    """
+    :return: names of all partitions of the port_count table, including the default partition
+    """
+    return [row[0] for row in conn.execute(CHILD_PARTITIONS_SQL, parent=PARENT_TABLE)]
+
+
+def get_partitions(conn):
+    """
+    :return: dictionary of month start -> partition name for all existing monthly partitions
+    """
+    names = get_child_tables(conn)
+    return {partition_month(name): name for name in names if partition_month(name) is not None}
+
+
+def create_partition(conn, month, has_default=False):
+    """
+    Create the partition for the given month. When a default partition exists any of its records
+    which fall in the month are moved into the new partition before it is attached, otherwise
+    postgres refuses to create the partition.
+    """
+    name = partition_name(month)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    if not has_default:
+        conn.execute("CREATE TABLE %s PARTITION OF %s FOR VALUES FROM ('%s') TO ('%s')" % (
+            name, PARENT_TABLE, start, end))
+        return
+
+    conn.execute('CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)' % (name, PARENT_TABLE))
+    moved = conn.execute(text("""
+        WITH moved AS (DELETE FROM %s WHERE collected_time >= :start AND collected_time < :end RETURNING *)
+        INSERT INTO %s SELECT * FROM moved
+    """ % (DEFAULT_PARTITION, name)), start=start, end=end).rowcount
+    conn.execute("ALTER TABLE %s ATTACH PARTITION %s FOR VALUES FROM ('%s') TO ('%s')" % (
+        PARENT_TABLE, name, start, end))
+    if moved:
+        log.info('Moved %d port count records from %s to %s', moved, DEFAULT_PARTITION, name)
+
+
+def create_partitions(conn, months_ahead, now=None):
+    """
+    Create the partitions for the current month and the following months_ahead months if they do not exist
+    :return: list of created partition names
+    """
+    if now is None:
+        now = datetime.datetime.utcnow()
+    existing = get_partitions(conn)
+    has_default = DEFAULT_PARTITION in get_child_tables(conn)
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(now, offset)
+        if month in existing:
+            continue
+        create_partition(conn, month, has_default)
+        created.append(partition_name(month))
+    return created
+
+
+def drop_expired_partitions(conn, retention_days, now=None):
+    """
+    Drop every partition whose entire range is older than retention_days. Dropping a partition
+    discards its records without the table bloat and vacuum cost of a bulk DELETE. Expired records
+    in the default partition are deleted.
+    :return: list of dropped partition names
+    """
+    if now is None:
+        now = datetime.datetime.utcnow()
+    cutoff = now - datetime.timedelta(days=retention_days)
+    dropped = []
+    for month, name in sorted(get_partitions(conn).items()):
+        if add_months(month, 1) <= cutoff:
+            conn.execute('DROP TABLE %s' % name)
+            dropped.append(name)
+    if DEFAULT_PARTITION in get_child_tables(conn):
+        conn.execute(text('DELETE FROM %s WHERE collected_time < :cutoff' % DEFAULT_PARTITION), cutoff=cutoff)
+    return dropped
+
+
+def is_partitioned(conn):
+    """
+    :return: True if port_count is a partitioned table (alembic revision 9c3e5f1a7b2d has been applied)
+    """
+    return bool(conn.execute(PARTITIONED_SQL, parent=PARENT_TABLE).scalar())
+
+
+def maintain_partitions(engine, months_ahead, retention_days=None):
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            log.warning('%s is not partitioned, skipping partition maintenance', PARENT_TABLE)
+            return [], []
+        created = create_partitions(conn, months_ahead)
+        dropped = []
+        if retention_days is not None:
+            dropped = drop_expired_partitions(conn, retention_days)
+    log.info('Port count partitions created: %r dropped: %r', created, dropped)
+    return created, dropped
+
+
+@click.command()
+@click.option('--months-ahead', type=int, help='Months of partitions to create in advance '
+                                               '(default PORT_COUNT_PARTITION_MONTHS_AHEAD)')
+@click.option('--retention-days', type=int, help='Drop partitions older than this (default PORT_COUNT_RETENTION_DAYS)')
+def main(months_ahead, retention_days):
+    config = load_config()
+    if months_ahead is None:
+        months_ahead = config['PORT_COUNT_PARTITION_MONTHS_AHEAD']
+    if retention_days is None:
+        retention_days = config['PORT_COUNT_RETENTION_DAYS']
+    engine = create_engine(config['MONITOR_URL'])
+    maintain_partitions(engine, months_ahead, retention_days)
+
+
+if __name__ == '__main__':
+    main()
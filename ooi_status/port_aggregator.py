@@ -0,0 +1,68 @@
+import datetime
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class PortCountAggregator(object):
+    """
+    Write-behind aggregator for port agent statistics.
+
+    Byte counts and elapsed seconds are summed per reference designator into fixed width
+    time buckets. A bucket is closed once the newest message time seen (capped at the current
+    time, to guard against a port agent with a fast clock) has passed the end of the bucket plus
+    a grace period for late arriving messages, at which point it can be written as a single
+    PortCount record labelled with the start of the bucket. Closing by message time rather than
+    wall clock time keeps buckets open while the consumer works through a backlog. A message
+    arriving after its bucket was written starts a new bucket, which is written as a second record.
+    """
+    def __init__(self, bucket_seconds, grace_seconds=0):
+        self.bucket_seconds = int(bucket_seconds)
+        self.bucket = datetime.timedelta(seconds=self.bucket_seconds)
+        self.grace = datetime.timedelta(seconds=grace_seconds)
+        self._buckets = {}
+        self._latest = None
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def bucket_start(self, collected):
+        seconds = int((collected - EPOCH).total_seconds())
+        return EPOCH + datetime.timedelta(seconds=seconds - seconds % self.bucket_seconds)
+
+    def add(self, refdes, collected, byte_count, seconds):
+        """
+        Add a single statistics record
+        :return: key of the bucket this record was added to
+        """
+        if self._latest is None or collected > self._latest:
+            self._latest = collected
+        key = (refdes, self.bucket_start(collected))
+        totals = self._buckets.setdefault(key, [0, 0])
+        totals[0] += byte_count
+        totals[1] += seconds
+        return key
+
+    def is_open(self, key):
+        return key in self._buckets
+
+    def pop_closed(self, now=None, force=False):
+        """
+        Remove all closed buckets
+        :param now: current time (UTC), defaults to utcnow
+        :param force: if True, remove all buckets regardless of age
+        :return: list of (refdes, bucket start, byte count, seconds)
+        """
+        if now is None:
+            now = datetime.datetime.utcnow()
+        if self._latest is None:
+            return []
+        cutoff = min(self._latest, now) - self.bucket - self.grace
+        closed = [key for key in self._buckets if force or key[1] <= cutoff]
+        out = []
+        for key in sorted(closed, key=lambda k: (k[1], k[0])):
+            byte_count, seconds = self._buckets.pop(key)
+            out.append((key[0], key[1], byte_count, seconds))
+        return out
+
+    def clear(self):
+        self._buckets.clear()
@@ -1,9 +1,12 @@
 import logging
-from collections import Counter
+import re
+from collections import Counter, OrderedDict
 from datetime import timedelta, datetime
 
 import pandas as pd
-from ooi_data.postgres.model import ExpectedStream, DeployedStream, PortCount, ReferenceDesignator
+from ooi_data.postgres.model import ExpectedStream, DeployedStream, PendingUpdate, PortCount, ReferenceDesignator
+from sqlalchemy import func, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.sql.elements import and_
 
 from .get_logger import get_logger
@@ -11,22 +14,145 @@ from .status_message import StatusEnum
 
 log = get_logger(__name__, logging.INFO)
 
-
-def get_status_query(session, filter_refdes=None, filter_method=None, filter_status=None, filter_stream=None):
-    query = session.query(DeployedStream).join(ExpectedStream, ReferenceDesignator)
-
+PORT_COUNT_UNITS = ('minute', 'hour', 'day')
+FILTER_MATCH_MODES = ('substring', 'prefix', 'exact')
+EXPECTED_STREAM_KEY = ['name', 'method']
+EXPECTED_STREAM_VALUES = ['expected_rate', 'warn_interval', 'fail_interval']
+# note appended to a pending update which replaced superseded updates (NOTIFY_COALESCE = 'summary')
+SUPERSEDED_NOTE = ' (%d superseded updates)'
+SUPERSEDED_NOTE_PATTERN = re.compile(r' \((\d+) superseded updates\)$')
+
+# Replace every bucket in the window which holds more than one record (or a record not aligned to
+# the bucket) with a single record holding the sums. Re-running over the same window is a no-op.
+DOWNSAMPLE_PORT_COUNT_SQL = '''
+WITH buckets AS (
+    SELECT pc.reference_designator_id, date_trunc('%(unit)s', pc.collected_time) AS bucket
+    FROM port_count pc
+    WHERE %(pc_window)s
+    GROUP BY 1, 2
+    HAVING count(*) > 1 OR bool_or(pc.collected_time <> date_trunc('%(unit)s', pc.collected_time))
+), moved AS (
+    DELETE FROM port_count p
+    USING buckets b
+    WHERE p.reference_designator_id = b.reference_designator_id
+      AND date_trunc('%(unit)s', p.collected_time) = b.bucket
+      AND %(p_window)s
+    RETURNING p.reference_designator_id, b.bucket, p.byte_count, p.seconds
+)
+INSERT INTO port_count (reference_designator_id, collected_time, byte_count, seconds)
+SELECT reference_designator_id, bucket, sum(byte_count), sum(seconds)
+FROM moved
+GROUP BY reference_designator_id, bucket
+'''
+
+
+def escape_like(value, escape='\\'):
+    """
+    Escape the LIKE wildcards in value so that it is matched literally
+    """
+    return value.replace(escape, escape * 2).replace('%', escape + '%').replace('_', escape + '_')
+
+
+def match_filter(column, value, match='substring'):
+    """
+    :param column: column to filter
+    :param value: value to match
+    :param match: 'exact' (indexed equality), 'prefix' (indexed range scan, e.g. a subsite or subsite-node
+                  selects that part of the reference designator hierarchy) or 'substring' (trigram index)
+    :return: filter clause
+    """
+    if match == 'exact':
+        return column == value
+    if match == 'prefix':
+        return column.like(escape_like(value) + '%', escape='\\')
+    if match == 'substring':
+        return column.like('%' + escape_like(value) + '%', escape='\\')
+    raise ValueError('unknown match mode %r' % match)
+
+
+def _status_filters(filter_refdes=None, filter_method=None, filter_status=None, filter_stream=None,
+                    match='substring'):
+    """
+    :return: list of filter clauses shared by all status queries joining DeployedStream, ExpectedStream
+             and ReferenceDesignator
+    """
     filter_constraints = []
     if filter_refdes:
-        filter_constraints.append(ReferenceDesignator.name.like('%%%s%%' % filter_refdes))
+        filter_constraints.append(match_filter(ReferenceDesignator.name, filter_refdes, match))
     if filter_method:
-        filter_constraints.append(ExpectedStream.method.like('%%%s%%' % filter_method))
+        filter_constraints.append(match_filter(ExpectedStream.method, filter_method, match))
     if filter_stream:
-        filter_constraints.append(ExpectedStream.name.like('%%%s%%' % filter_stream))
+        filter_constraints.append(match_filter(ExpectedStream.name, filter_stream, match))
     if filter_status:
-        filter_constraints.append(DeployedStream.status.like('%%%s%%' % filter_status))
+        filter_constraints.append(match_filter(DeployedStream.status, filter_status, match))
+    return filter_constraints
 
-    query = query.filter(*filter_constraints)
-    return query
+
+def get_status_query(session, filter_refdes=None, filter_method=None, filter_status=None, filter_stream=None,
+                     match='substring'):
+    query = session.query(DeployedStream).join(ExpectedStream, ReferenceDesignator)
+    return query.filter(*_status_filters(filter_refdes, filter_method, filter_status, filter_stream, match))
+
+
+def get_status_rows_query(session, filter_refdes=None, filter_method=None, filter_status=None, filter_stream=None,
+                          match='substring'):
+    """
+    Column projection equivalent of get_status_query. Selects every value needed for
+    DeployedStream.as_dict in a single query, build the dictionaries with status_row_dict.
+    """
+    deployed = DeployedStream.__table__.c
+    expected = ExpectedStream.__table__.c
+    query = session.query(
+        deployed.id,
+        deployed.reference_designator_id,
+        deployed.status,
+        deployed.status_time,
+        deployed.expected_rate,
+        deployed.warn_interval,
+        deployed.fail_interval,
+        ReferenceDesignator.name.label('reference_designator'),
+        expected.id.label('es_id'),
+        expected.name.label('es_name'),
+        expected.method.label('es_method'),
+        expected.expected_rate.label('es_expected_rate'),
+        expected.warn_interval.label('es_warn_interval'),
+        expected.fail_interval.label('es_fail_interval')
+    ).select_from(DeployedStream).join(ExpectedStream, ReferenceDesignator)
+    query = query.filter(*_status_filters(filter_refdes, filter_method, filter_status, filter_stream, match))
+    return query.order_by(ReferenceDesignator.name, ExpectedStream.name, ExpectedStream.method)
+
+
+def status_row_dict(row):
+    """
+    :param row: row from get_status_rows_query
+    :return: dictionary matching DeployedStream.as_dict
+    """
+    return {
+        'id': row.id,
+        'reference_designator': row.reference_designator,
+        'reference_designator_id': row.reference_designator_id,
+        'status': row.status,
+        'status_time': row.status_time,
+        'expected_rate': row.expected_rate,
+        'warn_interval': row.warn_interval,
+        'fail_interval': row.fail_interval,
+        'expected_stream': {
+            'id': row.es_id,
+            'name': row.es_name,
+            'method': row.es_method,
+            'expected_rate': row.es_expected_rate,
+            'warn_interval': row.es_warn_interval,
+            'fail_interval': row.es_fail_interval,
+        },
+    }
+
+
+def _group_by_instrument(rows):
+    out = {}
+    for row in rows:
+        out.setdefault(row.reference_designator, []).append(status_row_dict(row))
+    return {refdes: {'overall': _rollup_statuses(set(s['status'] for s in streams)), 'status': streams}
+            for refdes, streams in out.items()}
 
 
 def resample_port_count(session, refdes_id, counts_df, seconds):
@@ -44,6 +170,50 @@ def resample_port_count(session, refdes_id, counts_df, seconds):
         return resampled
 
 
+def truncate_time(dt, unit):
+    """
+    Truncate a datetime to the start of the minute, hour or day (equivalent to date_trunc)
+    """
+    dt = dt.replace(second=0, microsecond=0)
+    if unit in ('hour', 'day'):
+        dt = dt.replace(minute=0)
+    if unit == 'day':
+        dt = dt.replace(hour=0)
+    return dt
+
+
+def downsample_port_counts(session, unit, start, stop):
+    """
+    Roll up all port counts with start <= collected_time < stop to one record per reference designator
+    per unit (minute, hour or day) with a single statement. Must be called inside a transaction.
+    :param session: sqlalchemy session object
+    :param unit: resolution of the rolled up records
+    :param start: lower bound of the window (None for no lower bound)
+    :param stop: upper bound of the window
+    :return: number of records written
+    """
+    if unit not in PORT_COUNT_UNITS:
+        raise ValueError('Invalid downsampling unit: %r' % unit)
+
+    window = ['%(alias)s.collected_time < :stop']
+    if start is not None:
+        window.append('%(alias)s.collected_time >= :start')
+    window = ' AND '.join(window)
+
+    statement = text(DOWNSAMPLE_PORT_COUNT_SQL % {'unit': unit,
+                                                  'pc_window': window % {'alias': 'pc'},
+                                                  'p_window': window % {'alias': 'p'}})
+    return session.execute(statement, {'start': start, 'stop': stop}).rowcount
+
+
+def expire_port_counts(session, cutoff):
+    """
+    Delete all port counts collected before cutoff
+    :return: number of records deleted
+    """
+    return session.query(PortCount).filter(PortCount.collected_time < cutoff).delete(synchronize_session=False)
+
+
 def get_port_data_rates(session, refdes_id):
     counts_df = get_port_rates_dataframe(session, refdes_id, None, None)
     if not counts_df.empty:
@@ -52,47 +222,78 @@ def get_port_data_rates(session, refdes_id):
     return counts_df
 
 
-def get_status_by_instrument(session, filter_refdes=None, filter_method=None, filter_stream=None, filter_status=None):
+def get_instrument_page(session, filter_refdes=None, filter_method=None, filter_stream=None, filter_status=None,
+                        after=None, limit=100, match='substring'):
+    """
+    Fetch one page of the reference designators with streams matching the filters, in name order
+    :param after: return only reference designators after this name
+    :param limit: maximum number of reference designators to return
+    :return: (list of reference designator names, name to pass as after for the next page or None if this is the last)
+    """
     query = get_status_query(session,
                              filter_refdes=filter_refdes,
                              filter_method=filter_method,
                              filter_stream=filter_stream,
-                             filter_status=filter_status)
+                             filter_status=filter_status,
+                             match=match)
+    query = query.with_entities(ReferenceDesignator.name).distinct().order_by(ReferenceDesignator.name)
+    if after is not None:
+        query = query.filter(ReferenceDesignator.name > after)
 
-    # group by reference designator
-    grouped = {}
-    for ds in query:
-        refdes = ds.reference_designator.name
-        grouped.setdefault(refdes, []).append(ds)
+    names = [name for name, in query.limit(limit + 1)]
+    if len(names) > limit:
+        return names[:limit], names[limit - 1]
+    return names, None
 
-    out = {}
-    # create a rollup status
-    for refdes in grouped:
-        streams = grouped[refdes]
-        overall = _rollup_statuses(set(s.status for s in streams))
-        out[refdes] = {
-            'overall': overall,
-            'status': streams
-        }
 
-    return out
+def get_status_by_instrument(session, filter_refdes=None, filter_method=None, filter_stream=None, filter_status=None,
+                             refdes_names=None, match='substring'):
+    query = get_status_rows_query(session,
+                                  filter_refdes=filter_refdes,
+                                  filter_method=filter_method,
+                                  filter_stream=filter_stream,
+                                  filter_status=filter_status,
+                                  match=match)
+    if refdes_names is not None:
+        query = query.filter(ReferenceDesignator.name.in_(refdes_names))
+
+    # group by reference designator and create a rollup status
+    return _group_by_instrument(query)
 
 
 def get_status_by_refdes_id(session, refdes_id):
-    query = session.query(DeployedStream).join(ReferenceDesignator).filter(ReferenceDesignator.id == refdes_id)
-    streams = list(query)
-    overall = _rollup_statuses(set(s.status for s in streams))
+    query = get_status_rows_query(session).filter(ReferenceDesignator.id == refdes_id)
+    streams = [status_row_dict(row) for row in query]
+    overall = _rollup_statuses(set(s['status'] for s in streams))
     return {
         'overall': overall,
         'status': streams
     }
 
 
-def get_status_by_stream(session, filter_refdes=None, filter_method=None, filter_stream=None, filter_status=None):
-    return {
-        'status': list(get_status_query(session, filter_refdes=filter_refdes, filter_method=filter_method,
-                                        filter_stream=filter_stream, filter_status=filter_status))
-    }
+def get_status_by_stream(session, filter_refdes=None, filter_method=None, filter_stream=None, filter_status=None,
+                         after=None, limit=None, match='substring'):
+    """
+    :param after: (refdes, stream, method) of the last stream on the previous page
+    :param limit: maximum number of streams to return (None for all), in (refdes, stream, method) order
+    :return: dictionary with the list of deployed streams under 'status'. When paginated 'next' holds the
+             (refdes, stream, method) to pass as after for the next page, or None if this is the last page.
+    """
+    query = get_status_rows_query(session, filter_refdes=filter_refdes, filter_method=filter_method,
+                                  filter_stream=filter_stream, filter_status=filter_status, match=match)
+    if limit is None:
+        return {'status': [status_row_dict(row) for row in query]}
+
+    if after is not None:
+        query = query.filter(tuple_(ReferenceDesignator.name, ExpectedStream.name, ExpectedStream.method) >
+                             tuple_(*after))
+
+    rows = query.limit(limit + 1).all()
+    next_key = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_key = (last.reference_designator, last.es_name, last.es_method)
+    return {'status': [status_row_dict(row) for row in rows[:limit]], 'next': next_key}
 
 
 def get_status_by_stream_id(session, deployed_id):
@@ -127,6 +328,10 @@ def _rollup_statuses(statuses):
 
 def _rollup_status_query(query):
     statuses = Counter((status[0] for status in query))
+    return _rollup_status_counts(statuses)
+
+
+def _rollup_status_counts(statuses):
     rollup_status = _rollup_statuses(statuses)
     reasons = []
     for key in [StatusEnum.OPERATIONAL, StatusEnum.DEGRADED, StatusEnum.FAILED, StatusEnum.NOT_TRACKED]:
@@ -147,3 +352,116 @@ def get_rollup_status(session, refdes):
     query = session.query(DeployedStream.status).join(ReferenceDesignator)
     query = query.filter(ReferenceDesignator.name == refdes)
     return _rollup_status_query(query)
+
+
+def get_rollup_statuses(session, refdes_names):
+    """
+    Compute the rollup status for many instruments with a single aggregate query
+    :param session: sqlalchemy session object
+    :param refdes_names: iterable of reference designator names
+    :return: dictionary of refdes -> (rollup status, rollup reason), identical to get_rollup_status
+    """
+    counts = {refdes: Counter() for refdes in refdes_names}
+    if counts:
+        query = session.query(ReferenceDesignator.name, DeployedStream.status, func.count(DeployedStream.id))
+        query = query.select_from(DeployedStream).join(ReferenceDesignator)
+        query = query.filter(ReferenceDesignator.name.in_(list(counts)))
+        query = query.group_by(ReferenceDesignator.name, DeployedStream.status)
+        for refdes, status, count in query:
+            counts[refdes][status] = count
+    return {refdes: _rollup_status_counts(statuses) for refdes, statuses in counts.items()}
+
+
+def split_superseded_note(notes):
+    """
+    :return: (notes without the superseded note, number of superseded updates it recorded)
+    """
+    notes = notes or ''
+    match = SUPERSEDED_NOTE_PATTERN.search(notes)
+    if match is None:
+        return notes, 0
+    return notes[:match.start()], int(match.group(1))
+
+
+def coalesce_pending_updates(session, summarize=False):
+    """
+    Collapse pending updates which have been superseded by a later update for the same asset and
+    event, keeping only the latest. Must be called inside a transaction.
+
+    The event name is the stream name only, the delivery method is not part of the event. Streams
+    with the same name delivered by different methods for the same asset share a key, so the latest
+    update for one supersedes the others.
+    :param session: sqlalchemy session object
+    :param summarize: if True, note the number of superseded updates in the notes of the kept update,
+                      including those superseded by earlier passes
+    :return: number of pending updates removed
+    """
+    updates = OrderedDict()
+    for pu_id, message in session.query(PendingUpdate.id, PendingUpdate.message).order_by(PendingUpdate.id):
+        if message and message.get('assetUid'):
+            updates.setdefault((message['assetUid'], message.get('eventName')), []).append((pu_id, message))
+
+    superseded = []
+    table = PendingUpdate.__table__
+    for key in updates:
+        if len(updates[key]) < 2:
+            continue
+        superseded.extend(pu_id for pu_id, _ in updates[key][:-1])
+        if summarize:
+            count = sum(1 + split_superseded_note(message.get('notes'))[1] for _, message in updates[key][:-1])
+            pu_id, message = updates[key][-1]
+            notes, previous = split_superseded_note(message.get('notes'))
+            message = dict(message)
+            message['notes'] = notes + SUPERSEDED_NOTE % (count + previous)
+            session.execute(table.update().where(table.c.id == pu_id).values(message=message))
+
+    for start in range(0, len(superseded), 1000):
+        session.execute(table.delete().where(table.c.id.in_(superseded[start:start + 1000])))
+    return len(superseded)
+
+
+def diff_expected_streams(current, incoming):
+    """
+    Compare expected stream definitions against the current definitions
+    :param current: DataFrame of the existing expected streams
+    :param incoming: DataFrame of the new expected stream definitions, the last row for any (name, method) wins
+    :return: (DataFrame of new definitions, DataFrame of changed definitions, number of unchanged definitions)
+    """
+    fields = EXPECTED_STREAM_KEY + EXPECTED_STREAM_VALUES
+    incoming = incoming[fields].drop_duplicates(EXPECTED_STREAM_KEY, keep='last')
+    merged = incoming.merge(current[fields], on=EXPECTED_STREAM_KEY, how='left',
+                            suffixes=('', '_current'), indicator=True)
+
+    new = merged['_merge'] == 'left_only'
+    changed = pd.Series(False, index=merged.index)
+    for field in EXPECTED_STREAM_VALUES:
+        value, current_value = merged[field], merged[field + '_current']
+        changed |= (value != current_value) & ~(value.isnull() & current_value.isnull())
+    changed &= ~new
+
+    return merged[new][fields], merged[changed][fields], int((~new & ~changed).sum())
+
+
+def upsert_expected_streams(session, definitions):
+    """
+    Apply expected stream definitions, writing only new and changed rows with a single
+    INSERT ... ON CONFLICT (name, method) DO UPDATE. Must be called inside a transaction.
+    :param session: sqlalchemy session object
+    :param definitions: DataFrame with the columns name, method, expected_rate, warn_interval, fail_interval
+    :return: (number inserted, number updated, number unchanged)
+    """
+    fields = EXPECTED_STREAM_KEY + EXPECTED_STREAM_VALUES
+    table = ExpectedStream.__table__
+    current = pd.DataFrame(session.query(*[table.c[field] for field in fields]).all(), columns=fields)
+    inserts, updates, unchanged = diff_expected_streams(current, definitions)
+
+    changes = pd.concat([inserts, updates]).astype(object)
+    if len(changes):
+        records = changes.where(changes.notnull(), None).to_dict('records')
+        statement = insert(table).values(records)
+        statement = statement.on_conflict_do_update(
+            index_elements=EXPECTED_STREAM_KEY,
+            set_={field: statement.excluded[field] for field in EXPECTED_STREAM_VALUES})
+        session.execute(statement)
+
+    return len(inserts), len(updates), unchanged
@@ -0,0 +1,53 @@
+from ooi_data.postgres.model import ReferenceDesignator
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+
+class ReferenceDesignatorCache(object):
+    """
+    In-memory map of reference designator name to id, shared by the ingest and monitor code paths.
+
+    The entire reference_designator table is loaded on first use. Unknown names are created
+    with a single INSERT ... ON CONFLICT DO NOTHING RETURNING per call, so a cold start costs
+    one round trip instead of one (or two) per instrument. Ids created inside a transaction
+    which is later rolled back are invalid, callers must invalidate() the cache in that case.
+    """
+    def __init__(self):
+        self._ids = None
+
+    def load(self, session):
+        table = ReferenceDesignator.__table__
+        self._ids = dict(session.execute(select([table.c.name, table.c.id])).fetchall())
+
+    def invalidate(self):
+        self._ids = None
+
+    def get_ids(self, session, names):
+        """
+        Fetch the ids for the supplied reference designators, creating any which do not exist
+        :param session: sqlalchemy session object
+        :param names: iterable of reference designator names
+        :return: dictionary of name -> id
+        """
+        if self._ids is None:
+            self.load(session)
+
+        names = set(names)
+        missing = names.difference(self._ids)
+        if missing:
+            table = ReferenceDesignator.__table__
+            statement = insert(table).values([{'name': name} for name in missing])
+            statement = statement.on_conflict_do_nothing(index_elements=['name'])
+            statement = statement.returning(table.c.name, table.c.id)
+            self._ids.update(session.execute(statement).fetchall())
+
+            # rows created concurrently by another process are not returned by the insert
+            missing = missing.difference(self._ids)
+            if missing:
+                query = select([table.c.name, table.c.id]).where(table.c.name.in_(missing))
+                self._ids.update(session.execute(query).fetchall())
+
+        return {name: self._ids[name] for name in names}
+
+    def get_id(self, session, name):
+        return self.get_ids(session, [name])[name]
@@ -0,0 +1,204 @@
+import calendar
+import functools
+import logging
+import math
+import threading
+import time
+
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+from ooi_status.get_logger import get_logger
+
+log = get_logger(__name__, logging.INFO)
+
+
+def epoch_seconds(dt):
+    """
+    :return: seconds since the epoch for a timezone aware datetime
+    """
+    return calendar.timegm(dt.utctimetuple()) + dt.microsecond / 1e6
+
+
+class JobStats(object):
+    """
+    Running totals for a single scheduled job
+    """
+    def __init__(self):
+        self.runs = 0
+        self.errors = 0
+        self.missed = 0
+        self.skipped = 0
+        self.last_start = None
+        self.last_lag = None
+        self.max_lag = 0.0
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+
+    def as_dict(self):
+        return {
+            'runs': self.runs,
+            'errors': self.errors,
+            'missed': self.missed,
+            'skipped': self.skipped,
+            'last_lag': self.last_lag,
+            'max_lag': self.max_lag,
+            'last_duration': self.last_duration,
+            'max_duration': self.max_duration,
+            'mean_duration': self.total_duration / self.runs if self.runs else None,
+        }
+
+
+class AdaptiveInterval(object):
+    """
+    Stretches the period of a job which keeps running longer than its period.
+
+    After overrun_limit consecutive runs longer than the current period the period is raised to the
+    smallest multiple of the base period which gives the last run 25% headroom (up to max_period).
+    After overrun_limit consecutive runs shorter than half the current period it is lowered again
+    in the same way, until it is back at the base period.
+    """
+    HEADROOM = 1.25
+
+    def __init__(self, period, overrun_limit=3, max_period=None):
+        self.period = period
+        self.current = period
+        self.overrun_limit = overrun_limit
+        self.max_period = max_period or period * 10
+        self.overruns = 0
+        self.underruns = 0
+
+    def _fit(self, duration):
+        multiple = max(int(math.ceil(duration * self.HEADROOM / self.period)), 1)
+        return min(self.period * multiple, max(self.max_period, self.period))
+
+    def update(self, duration):
+        """
+        Record the duration of a run
+        :return: the new period if it has changed, otherwise None
+        """
+        if duration > self.current:
+            self.overruns += 1
+            self.underruns = 0
+        elif duration < self.current / 2.0 and self.current > self.period:
+            self.underruns += 1
+            self.overruns = 0
+        else:
+            self.overruns = self.underruns = 0
+            return None
+
+        if max(self.overruns, self.underruns) < self.overrun_limit:
+            return None
+
+        self.overruns = self.underruns = 0
+        period = self._fit(duration)
+        if period == self.current:
+            return None
+        self.current = period
+        return period
+
+
+class MonitorScheduler(object):
+    """
+    Scheduler for the status monitor jobs.
+
+    Every job runs in its own single thread executor so a slow job never delays another, with at most
+    one instance running and missed runs coalesced into one. Lag (actual start - scheduled start),
+    duration, errors and missed/skipped runs are recorded per job. A job added with an
+    AdaptiveInterval is moved from its trigger to a stretched interval while it overruns its period,
+    and back to its original trigger once it recovers.
+    """
+    def __init__(self, scheduler=None, misfire_grace_time=30):
+        self.scheduler = scheduler or BlockingScheduler()
+        self.misfire_grace_time = misfire_grace_time
+        self.stats = {}
+        self.triggers = {}
+        self.adaptive = {}
+        self._lock = threading.Lock()
+        self.scheduler.add_listener(self._on_event, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR |
+                                    EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+
+    def add_job(self, func, job_id, trigger, adaptive=None, **trigger_args):
+        """
+        Add a job in its own executor
+        :param func: callable to run
+        :param job_id: unique name for the job (also the executor alias)
+        :param trigger: trigger alias or instance, as for apscheduler add_job
+        :param adaptive: optional AdaptiveInterval for the job
+        """
+        self.stats[job_id] = JobStats()
+        if adaptive is not None:
+            self.adaptive[job_id] = adaptive
+        self.scheduler.add_executor(ThreadPoolExecutor(max_workers=1), alias=job_id)
+        job = self.scheduler.add_job(self._timed(job_id, func), trigger, id=job_id, name=job_id, executor=job_id,
+                                     coalesce=True, max_instances=1, misfire_grace_time=self.misfire_grace_time,
+                                     **trigger_args)
+        self.triggers[job_id] = job.trigger
+        return job
+
+    def _timed(self, job_id, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            stats = self.stats[job_id]
+            stats.last_start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.time() - stats.last_start
+                with self._lock:
+                    stats.last_duration = duration
+                    stats.max_duration = max(stats.max_duration, duration)
+                    stats.total_duration += duration
+        return timed
+
+    def _on_event(self, event):
+        stats = self.stats.get(event.job_id)
+        if stats is None:
+            return
+
+        with self._lock:
+            if event.code == EVENT_JOB_MISSED:
+                stats.missed += 1
+                log.warning('Job %s missed run at %s', event.job_id, event.scheduled_run_time)
+                return
+            if event.code == EVENT_JOB_MAX_INSTANCES:
+                stats.skipped += 1
+                log.warning('Job %s still running, skipped run at %s', event.job_id, event.scheduled_run_times)
+                return
+
+            stats.runs += 1
+            if event.code == EVENT_JOB_ERROR:
+                stats.errors += 1
+            if stats.last_start is not None:
+                stats.last_lag = max(stats.last_start - epoch_seconds(event.scheduled_run_time), 0.0)
+                stats.max_lag = max(stats.max_lag, stats.last_lag)
+            duration = stats.last_duration
+
+        adaptive = self.adaptive.get(event.job_id)
+        if adaptive is not None and duration is not None:
+            period = adaptive.update(duration)
+            if period is not None:
+                self._reschedule(event.job_id, period, adaptive.period)
+
+    def _reschedule(self, job_id, period, base_period):
+        if period == base_period:
+            log.warning('Job %s recovered, restoring original schedule', job_id)
+            trigger = self.triggers[job_id]
+        else:
+            log.warning('Job %s is overrunning its period, now running every %d seconds', job_id, period)
+            trigger = IntervalTrigger(seconds=period)
+        self.scheduler.reschedule_job(job_id, trigger=trigger)
+
+    def get_stats(self):
+        with self._lock:
+            return {job_id: stats.as_dict() for job_id, stats in self.stats.items()}
+
+    def log_stats(self):
+        for job_id, stats in sorted(self.get_stats().items()):
+            log.info('Job %s: %r', job_id, stats)
+
+    def start(self):
+        self.scheduler.start()
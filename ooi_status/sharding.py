@@ -0,0 +1,149 @@
+import logging
+import threading
+import zlib
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from ooi_status.get_logger import get_logger
+
+log = get_logger(__name__, logging.INFO)
+
+# first key of the two-key advisory locks taken by the monitor, the second key is the slot/shard number
+MEMBER_LOCK = 0x4f4f0001
+SHARD_LOCK = 0x4f4f0002
+LEADER_LOCK = 0x4f4f0003
+
+TRY_LOCK_SQL = text('SELECT pg_try_advisory_lock(:namespace, :key)')
+UNLOCK_SQL = text('SELECT pg_advisory_unlock(:namespace, :key)')
+COUNT_LOCKS_SQL = text('''
+SELECT count(*) FROM pg_locks
+WHERE locktype = 'advisory' AND granted AND classid = :namespace AND objsubid = 2
+  AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+''')
+
+
+def shard_for(refdes, shard_count):
+    """
+    :return: the shard (0 to shard_count - 1) which a reference designator belongs to
+    """
+    return (zlib.crc32(refdes.encode('utf-8')) & 0xffffffff) % shard_count
+
+
+def fair_share(shard_count, members):
+    """
+    :return: maximum number of shards a single instance should own
+    """
+    return -(-shard_count // max(members, 1))
+
+
+class ShardCoordinator(object):
+    """
+    Splits the reference designators between monitor instances sharing a monitor database.
+
+    Reference designators are hashed into a fixed number of shards and each instance owns a subset
+    of the shards, held as session level advisory locks on a dedicated connection. Each instance
+    also holds a membership slot lock, so every instance can count the live instances and claim
+    its fair share of shards on each rebalance. The locks of an instance which dies are released
+    by Postgres when its connection drops and its shards are claimed by the survivors on their
+    next rebalance. A single leader lock elects the instance which runs the global jobs (event
+    delivery and port count maintenance).
+    """
+    def __init__(self, engine, shard_count, max_members=16):
+        self.engine = engine
+        self.shard_count = shard_count
+        self.max_members = max_members
+        self.conn = None
+        self.member = None
+        self.shards = frozenset()
+        self.leader = False
+        # rebalance (check_all) and is_leader (other jobs) are called from different scheduler threads
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = self.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        return self.conn
+
+    def _try_lock(self, namespace, key):
+        return self._connect().execute(TRY_LOCK_SQL, namespace=namespace, key=key).scalar()
+
+    def _unlock(self, namespace, key):
+        self._connect().execute(UNLOCK_SQL, namespace=namespace, key=key)
+
+    def reset(self):
+        """
+        Close the lock connection, releasing every lock held by this instance
+        """
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except DBAPIError:
+                log.exception('Error closing shard lock connection')
+        self.conn = None
+        self.member = None
+        self.shards = frozenset()
+        self.leader = False
+
+    def owns(self, refdes):
+        return shard_for(refdes, self.shard_count) in self.shards
+
+    def is_leader(self):
+        """
+        :return: True if this instance holds (or has just acquired) the leader lock
+        """
+        with self._lock:
+            if not self.leader:
+                try:
+                    self.leader = self._try_lock(LEADER_LOCK, 0)
+                except DBAPIError:
+                    log.exception('Unable to acquire leader lock')
+                    self.reset()
+            return self.leader
+
+    def rebalance(self):
+        """
+        Join the group if necessary and claim or release shards until this instance owns its fair share
+        :return: True if the set of owned shards changed
+        """
+        before = self.shards
+        with self._lock:
+            try:
+                self._rebalance()
+            except DBAPIError:
+                log.exception('Shard rebalance failed, releasing all shards')
+                self.reset()
+        if self.shards != before:
+            log.info('Shard ownership changed: member %r owns %d/%d shards %r (leader: %r)',
+                     self.member, len(self.shards), self.shard_count, sorted(self.shards), self.leader)
+        return self.shards != before
+
+    def _rebalance(self):
+        if self.member is None:
+            for slot in range(self.max_members):
+                if self._try_lock(MEMBER_LOCK, slot):
+                    self.member = slot
+                    break
+            else:
+                log.warning('All %d monitor member slots are taken, not claiming any shards', self.max_members)
+                return
+
+        members = self._connect().execute(COUNT_LOCKS_SQL, namespace=MEMBER_LOCK).scalar()
+        share = fair_share(self.shard_count, members)
+
+        shards = set(self.shards)
+        for shard in sorted(shards, reverse=True)[:max(len(shards) - share, 0)]:
+            self._unlock(SHARD_LOCK, shard)
+            shards.discard(shard)
+
+        # start searching at a member specific offset so that instances do not all contend for the same shards
+        offset = self.member * share
+        for index in range(self.shard_count):
+            if len(shards) >= share:
+                break
+            shard = (offset + index) % self.shard_count
+            if shard not in shards and self._try_lock(SHARD_LOCK, shard):
+                shards.add(shard)
+
+        self.shards = frozenset(shards)
+        self.is_leader()
@@ -0,0 +1,66 @@
+import datetime
+import logging
+import os
+import pickle
+import tempfile
+import zlib
+
+from ooi_status.get_logger import get_logger
+
+log = get_logger(__name__, logging.INFO)
+
+SNAPSHOT_VERSION = 1
+
+
+def write_snapshot(path, state):
+    """
+    Atomically write monitor state to path as a zlib compressed pickle. The snapshot is written to a
+    temporary file in the same directory and renamed over the previous snapshot, so a crash mid-write
+    never leaves a truncated snapshot behind.
+    :param path: snapshot file name
+    :param state: dictionary of picklable (plain python) values
+    :return: size of the snapshot in bytes
+    """
+    state = dict(state, version=SNAPSHOT_VERSION, created=datetime.datetime.utcnow())
+    data = zlib.compress(pickle.dumps(state, 2))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.snapshot-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.rename(temp_path, path)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+    return len(data)
+
+
+def read_snapshot(path, max_age=None):
+    """
+    Read a snapshot written by write_snapshot
+    :param path: snapshot file name
+    :param max_age: maximum age of the snapshot in seconds (None for any age)
+    :return: state dictionary or None if there is no usable snapshot
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'rb') as fh:
+            state = pickle.loads(zlib.decompress(fh.read()))
+    except Exception:
+        log.exception('Unable to read snapshot %s', path)
+        return None
+
+    if state.get('version') != SNAPSHOT_VERSION:
+        log.warning('Ignoring snapshot %s with version %r', path, state.get('version'))
+        return None
+
+    age = datetime.datetime.utcnow() - state['created']
+    if max_age is not None and age > datetime.timedelta(seconds=max_age):
+        log.warning('Ignoring snapshot %s, %s old', path, age)
+        return None
+    return state
@@ -0,0 +1,30 @@
+import numpy as np
+from ooi_data.postgres.model import StatusEnum
+
+
+def evaluate_statuses(elapsed, warn_interval, fail_interval):
+    """
+    Vectorized equivalent of DeployedStream.get_status for many streams at once.
+
+    A stream with both intervals set to zero is not tracked. Otherwise it is failed if the
+    time since its last particle exceeds the fail interval, degraded if it exceeds the warn
+    interval and operational if not.
+    :param elapsed: array of seconds since the last particle for each stream
+    :param warn_interval: array of effective warn intervals (seconds)
+    :param fail_interval: array of effective fail intervals (seconds)
+    :return: (array of statuses, array of the interval which determined each status or None)
+    """
+    elapsed = np.asarray(elapsed, dtype='float64')
+    warn_interval = np.asarray(warn_interval, dtype='float64')
+    fail_interval = np.asarray(fail_interval, dtype='float64')
+
+    not_tracked = (warn_interval == 0) & (fail_interval == 0)
+    failed = ~not_tracked & (elapsed > fail_interval)
+    degraded = ~not_tracked & ~failed & (elapsed > warn_interval)
+
+    statuses = np.select([not_tracked, failed, degraded],
+                         [StatusEnum.NOT_TRACKED, StatusEnum.FAILED, StatusEnum.DEGRADED],
+                         default=StatusEnum.OPERATIONAL).astype(object)
+    intervals = np.where(failed, fail_interval, warn_interval).astype('int64').astype(object)
+    intervals[not_tracked] = None
+    return statuses, intervals
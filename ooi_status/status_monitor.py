@@ -5,32 +5,39 @@ RSN health and status monitor for data particles received by OOI CI.
 """
 import datetime
 import logging
-import os
+import multiprocessing
+import threading
+import time
 
 import click
 import pandas as pd
-import requests
-from apscheduler.schedulers.blocking import BlockingScheduler
-from cachetools import LRUCache, cached
-from flask import Config
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.orm.exc import ObjectDeletedError
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import bindparam, create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
 
-from ooi_data.postgres.model import DeployedStream, ExpectedStream, ReferenceDesignator, PendingUpdate, StatusEnum
+from ooi_data.postgres.model import DeployedStream, ReferenceDesignator, PendingUpdate, StatusEnum
 
-from ooi_status.event_notifier import EventNotifier
+from ooi_status.active_streams import ActiveStreamTable
+from ooi_status.config import load_config
+from ooi_status.event_notifier import CircuitBreaker, EventNotifier
 from ooi_status.metadata_queries import get_active_streams
+from ooi_status.partitions import maintain_partitions
+from ooi_status.refdes_cache import ReferenceDesignatorCache
+from ooi_status.scheduling import AdaptiveInterval, MonitorScheduler
+from ooi_status.sharding import ShardCoordinator
+from ooi_status.snapshot import read_snapshot, write_snapshot
 from ooi_status.status_message import StatusMessage
+from ooi_status.stream_index import DeployedStreamIndex
+from ooi_status.transition_scheduler import TransitionScheduler
 from .get_logger import get_logger
-from .queries import (resample_port_count, get_port_rates_dataframe, get_rollup_status)
+from .queries import (resample_port_count, get_port_rates_dataframe, get_rollup_statuses, coalesce_pending_updates,
+                      downsample_port_counts, expire_port_counts, truncate_time, upsert_expected_streams)
+from .status_eval import evaluate_statuses
 from .stop_watch import stopwatch
 
 log = get_logger(__name__, logging.INFO)
-here = os.path.dirname(__file__)
 
 MAX_STATUS_POST_FAILURES = 5
-STREAM_CACHE = LRUCache(3000)
 
 
 class StatusMonitor(object):
@@ -41,58 +48,83 @@ class StatusMonitor(object):
         self.metadata_engine = create_engine(config['METADATA_URL'])
 
         self.session_factory = sessionmaker(bind=self.engine, autocommit=True)
-        self.session = self.session_factory()
+        # jobs run concurrently in separate threads (see MonitorScheduler), each with its own session
+        self.session = scoped_session(self.session_factory)
 
         self.metadata_session_factory = sessionmaker(bind=self.metadata_engine, autocommit=True)
-        self.metadata_session = self.metadata_session_factory()
+        self.metadata_session = scoped_session(self.metadata_session_factory)
 
-    @cached(STREAM_CACHE)
-    def _get_or_create_stream(self, refdes, stream, method):
-        refdes_obj = ReferenceDesignator.get_or_create(self.session, refdes)
-        expected_obj = ExpectedStream.get_or_create(self.session, stream, method)
-        return DeployedStream.get_or_create(self.session, refdes_obj, expected_obj)
+        self.refdes_cache = ReferenceDesignatorCache()
 
-    def get_or_create_stream(self, refdes, stream, method):
+        self.active_streams = ActiveStreamTable(config.get('INCREMENTAL_LOOKBACK_SECONDS', 3600))
+        self.last_full_sync = None
+        self.transitions = TransitionScheduler()
+        self.stream_index = DeployedStreamIndex(self.refdes_cache, config.get('DEPLOYED_INDEX_REFRESH_SECONDS', 300))
+        self.notifier = None
+        self.resample_pool = None
+        # guards the in-memory stream state shared by check_all, snapshots and the snapshot reconcile
+        self.state_lock = threading.RLock()
+
+        self.shards = None
+        if config.get('MONITOR_SHARDS'):
+            self.shards = ShardCoordinator(self.engine, config['MONITOR_SHARDS'],
+                                           config.get('MONITOR_MAX_INSTANCES', 16))
+
+    def is_leader(self):
+        """
+        :return: True if this instance should run the global jobs (always True when not sharded)
+        """
+        return self.shards is None or self.shards.is_leader()
+
+    def ensure_streams(self, rows):
         """
-        Attempt to fetch this value from the cached method. If the cached value no longer exists,
-        delete from the cache and create a new object.
+        Refresh the deployed stream index if stale and create any streams in rows which do not yet exist
+        :param rows: list of (StreamMetadatum, elapsed, uid)
         """
         try:
-            ds = self._get_or_create_stream(refdes, stream, method)
-            s = ds.status
-        except ObjectDeletedError:
-            del STREAM_CACHE[(self, refdes, stream, method)]
-            ds = self._get_or_create_stream(refdes, stream, method)
-        return ds
+            with self.session.begin():
+                self.stream_index.refresh(self.session)
+                self.stream_index.ensure(self.session, (ActiveStreamTable.key(row[0]) for row in rows))
+        except Exception:
+            self.refdes_cache.invalidate()
+            self.stream_index.invalidate()
+            raise
 
     @stopwatch()
     def read_expected_csv(self, filename):
         """ Populate expected stream definitions from definition in CSV-formatted file"""
         log.info('Populating the expected streams table')
         df = pd.read_csv(filename)
-        fields = ['name', 'method', 'expected_rate', 'warn_interval', 'fail_interval']
         with self.session.begin():
-            for stream, method, rate, warn_interval, fail_interval in df[fields].itertuples(index=False):
-                es = ExpectedStream.get_or_create(self.session, stream, method)
-                es.expected_rate = rate
-                es.warn_interval = warn_interval
-                es.fail_interval = fail_interval
-                self.session.add(es)
+            inserted, updated, unchanged = upsert_expected_streams(self.session, df)
+        log.info('Expected streams: %d inserted, %d updated, %d unchanged', inserted, updated, unchanged)
+        return inserted, updated, unchanged
 
     @stopwatch()
     def _check_status(self, rows):
         now = datetime.datetime.utcnow()
+        incremental = self.config.get('INCREMENTAL_CHECK')
 
         messages = []
-        with self.session.begin():
-
-            for stream_metadata, elapsed, uid in rows:
-                deployed = self.get_or_create_stream(stream_metadata.refdes,
-                                                     stream_metadata.stream,
-                                                     stream_metadata.method)
+        rows = list(rows)
+        self.ensure_streams(rows)
 
+        with self.session.begin():
+            ids = [self.stream_index.get(ActiveStreamTable.key(row[0])).id for row in rows]
+            deployed_streams = {}
+            for start in range(0, len(ids), 1000):
+                query = self.session.query(DeployedStream).filter(DeployedStream.id.in_(ids[start:start + 1000]))
+                deployed_streams.update((deployed.id, deployed) for deployed in query)
+
+            for (stream_metadata, elapsed, uid), deployed_id in zip(rows, ids):
+                deployed = deployed_streams[deployed_id]
                 status, interval = deployed.get_status(elapsed)
 
+                if incremental:
+                    deadline = self.transitions.next_deadline(now - elapsed, elapsed,
+                                                              deployed.warn_interval, deployed.fail_interval)
+                    self.transitions.schedule(ActiveStreamTable.key(stream_metadata), deadline)
+
                 if deployed.status == status:
                     continue
 
@@ -105,43 +137,174 @@ class StatusMonitor(object):
                                               interval))
                 deployed.status = status
                 deployed.status_time = now
+                self.stream_index.set_status(ActiveStreamTable.key(stream_metadata), status)
+
+        return messages
+
+    @stopwatch()
+    def _check_status_vectorized(self, rows):
+        """
+        Evaluate the status of all supplied streams in a single pass over arrays of elapsed times and
+        effective thresholds from the deployed stream index. Only streams whose status changed are
+        loaded through the ORM.
+        """
+        now = datetime.datetime.utcnow()
+        incremental = self.config.get('INCREMENTAL_CHECK')
+
+        active = pd.DataFrame([(sm.refdes, sm.stream, sm.method, elapsed.total_seconds(), index)
+                               for index, (sm, elapsed, uid) in enumerate(rows)],
+                              columns=['refdes', 'stream', 'method', 'elapsed', 'row'])
+        if active.empty:
+            return []
+
+        self.ensure_streams(rows)
+        known = active.merge(self.stream_index.frame(), on=['refdes', 'stream', 'method'])
+        warn_intervals = known.warn_interval.values
+        fail_intervals = known.fail_interval.values
+        statuses, intervals = evaluate_statuses(known.elapsed.values, warn_intervals, fail_intervals)
+
+        if incremental:
+            for index, warn_interval, fail_interval in zip(known.row.values, warn_intervals, fail_intervals):
+                stream_metadata, elapsed, _ = rows[index]
+                deadline = self.transitions.next_deadline(now - elapsed, elapsed, warn_interval, fail_interval)
+                self.transitions.schedule(ActiveStreamTable.key(stream_metadata), deadline)
+
+        changed_mask = statuses != known.status.values
+        changed = {}
+        for deployed_id, index, status, interval in zip(known.id.values[changed_mask], known.row.values[changed_mask],
+                                                        statuses[changed_mask], intervals[changed_mask]):
+            changed[int(deployed_id)] = index, status, interval
 
+        messages = []
+        if changed:
+            with self.session.begin():
+                for deployed in self.session.query(DeployedStream).filter(DeployedStream.id.in_(list(changed))):
+                    index, status, interval = changed[deployed.id]
+                    stream_metadata, elapsed, uid = rows[index]
+                    messages.append(StatusMessage(stream_metadata.refdes,
+                                                  stream_metadata.stream,
+                                                  uid,
+                                                  elapsed,
+                                                  deployed.status,
+                                                  status,
+                                                  interval))
+                    deployed.status = status
+                    deployed.status_time = now
+                    self.stream_index.set_status(ActiveStreamTable.key(stream_metadata), status)
+
+        log.info('Evaluated %d streams, %d changed', len(active), len(messages))
         return messages
 
     @stopwatch()
     def _add_rollup_status(self, in_messages):
-        status_dict = {}
         out_messages = []
         with self.session.begin():
+            status_dict = get_rollup_statuses(self.session, set(each.refdes for each in in_messages))
             for each in in_messages:
-                rollup_status, rollup_reason = status_dict.get(each.refdes, (None, None))
-                if rollup_status is None:
-                    rollup_status, rollup_reason = get_rollup_status(self.session, each.refdes)
-                    status_dict[each.refdes] = rollup_status, rollup_reason
-                each.instrument_status = rollup_status
-                each.instrument_reason = rollup_reason
+                each.instrument_status, each.instrument_reason = status_dict[each.refdes]
                 out_messages.append(each)
         return out_messages
 
+    def start_resample_pool(self):
+        """
+        Start the RESAMPLE_PROCESSES worker pool used by resample_count_data_hourly. This must be called
+        before any jobs or other threads are started, so that the workers are forked from a single
+        threaded process holding no open database connections.
+        """
+        processes = self.config.get('RESAMPLE_PROCESSES') or 1
+        if processes > 1 and self.resample_pool is None:
+            self.resample_pool = multiprocessing.Pool(processes)
+
+    @stopwatch()
     def resample_count_data_hourly(self):
+        """
+        Resample the port counts in the configured window to hourly sums using pandas, one reference
+        designator at a time. If the resample pool has been started (see start_resample_pool) the
+        reference designators are sharded across its processes, each worker using its own engine and
+        transactions.
+        :return: list of per-shard summaries (see resample_shard)
+        """
+        if not self.is_leader():
+            return
         window_start = self.config.get('RESAMPLE_WINDOW_START_HOURS')
         window_end = self.config.get('RESAMPLE_WINDOW_END_HOURS')
         # get a datetime object representing this HOUR
         now = datetime.datetime.utcnow().replace(second=0, minute=0)
         window_start_dt = now - datetime.timedelta(hours=window_start)
         window_end_dt = now - datetime.timedelta(hours=window_end)
-        session = self.session_factory()
 
-        for reference_designator in self.session.query(ReferenceDesignator):
-            log.info('Resampling %s', reference_designator)
-            with session.begin():
-                counts_df = get_port_rates_dataframe(session, reference_designator.id, window_end_dt, window_start_dt)
-                resample_port_count(session, reference_designator.id, counts_df, 3600)
+        with self.session.begin():
+            refdes_ids = [refdes_id for refdes_id, in
+                          self.session.query(ReferenceDesignator.id).order_by(ReferenceDesignator.id)]
+
+        url = self.config['MONITOR_URL']
+        if self.resample_pool is None:
+            summaries = [resample_shard(url, refdes_ids, window_end_dt, window_start_dt)]
+        else:
+            processes = self.config['RESAMPLE_PROCESSES']
+            shards = [refdes_ids[index::processes] for index in range(processes)]
+            results = [self.resample_pool.apply_async(resample_shard, (url, shard, window_end_dt, window_start_dt))
+                       for shard in shards if shard]
+            summaries = [result.get() for result in results]
+
+        for index, summary in enumerate(summaries):
+            log.info('Resampled shard %d: %d reference designators, %d records read, %d written in %.1fs',
+                     index, summary['refdes'], summary['read'], summary['written'], summary['elapsed'])
+        return summaries
+
+    @stopwatch()
+    def downsample_port_counts(self):
+        """
+        Roll port counts up through the tiers in PORT_COUNT_TIERS. Records older than the age of a tier
+        (but younger than the age of the next tier) are reduced to one record per reference designator
+        per tier resolution. Records older than PORT_COUNT_RETENTION_DAYS are deleted, unless port_count
+        is partitioned (PORT_COUNT_PARTITIONED) in which case expired partitions are dropped instead.
+        """
+        if not self.is_leader():
+            return
+        now = datetime.datetime.utcnow()
+        tiers = self.config.get('PORT_COUNT_TIERS') or []
+        retention = self.config.get('PORT_COUNT_RETENTION_DAYS')
+
+        cutoffs = [now - datetime.timedelta(hours=age) for _, age in tiers]
+        cutoffs.append(now - datetime.timedelta(days=retention) if retention else None)
+
+        for (unit, _), stop, start in zip(tiers, cutoffs, cutoffs[1:]):
+            stop = truncate_time(stop, unit)
+            if start is not None:
+                start = truncate_time(start, unit)
+            with self.session.begin():
+                written = downsample_port_counts(self.session, unit, start, stop)
+            log.info('Downsampled port counts to %s resolution (%s - %s): %d records written',
+                     unit, start, stop, written)
+
+        if retention and not self.config.get('PORT_COUNT_PARTITIONED'):
+            with self.session.begin():
+                deleted = expire_port_counts(self.session, cutoffs[-1])
+            log.info('Expired %d port count records older than %s', deleted, cutoffs[-1])
+
+    @stopwatch()
+    def maintain_port_count_partitions(self):
+        """
+        Create upcoming monthly port_count partitions and drop those older than PORT_COUNT_RETENTION_DAYS
+        """
+        if not self.is_leader():
+            return
+        maintain_partitions(self.engine, self.config.get('PORT_COUNT_PARTITION_MONTHS_AHEAD', 3),
+                            self.config.get('PORT_COUNT_RETENTION_DAYS'))
 
     def get_status_notifier(self):
-        root_url = self.config.get('NOTIFY_URL_ROOT')
-        event_port = self.config.get('NOTIFY_URL_PORT')
-        return EventNotifier(self.session, root_url, event_port)
+        if self.notifier is None:
+            root_url = self.config.get('NOTIFY_URL_ROOT')
+            event_port = self.config.get('NOTIFY_URL_PORT')
+            breaker = CircuitBreaker(failure_threshold=self.config.get('NOTIFY_BREAKER_THRESHOLD', 3),
+                                     base_delay=self.config.get('NOTIFY_BREAKER_BASE_DELAY', 30),
+                                     max_delay=self.config.get('NOTIFY_BREAKER_MAX_DELAY', 900))
+            self.notifier = EventNotifier(self.session, root_url, event_port,
+                                          max_workers=self.config.get('NOTIFY_WORKERS', 8),
+                                          timeout=self.config.get('NOTIFY_TIMEOUT'),
+                                          breaker=breaker)
+        return self.notifier
 
     @stopwatch()
     def save_pending(self, messages):
@@ -150,62 +313,279 @@ class StatusMonitor(object):
                 log.info('Staging status message: %r', message)
                 self.session.add(PendingUpdate(message=message.as_dict()))
 
+    @stopwatch()
+    def get_active_incremental(self):
+        """
+        Update the in-memory active stream table with only those streams which have received data
+        since the previous tick (or the complete active set every FULL_RESYNC_SECONDS)
+        :return: rows for every stream which needs to be evaluated, in the same form as get_active_streams.
+                 This is every active stream on a full resync, otherwise only the streams which received
+                 new data or whose next warn/fail threshold crossing has passed.
+        """
+        now = datetime.datetime.utcnow()
+        resync = datetime.timedelta(seconds=self.config.get('FULL_RESYNC_SECONDS', 900))
+        if self.last_full_sync is None or now - self.last_full_sync >= resync:
+            changed = self.active_streams.update(get_active_streams(self.metadata_session), full=True)
+            self.last_full_sync = now
+            self.transitions.clear()
+            self.stream_index.invalidate()
+            log.info('Full active stream resync: %d streams (%d changed)', len(self.active_streams), len(changed))
+            return self.active_streams.rows(now)
+
+        since = self.active_streams.since()
+        changed = self.active_streams.update(get_active_streams(self.metadata_session, since=since))
+        due = self.transitions.pop_due(now)
+        log.info('Incremental active stream update since %s: %d changed, %d due', since, len(changed), len(due))
+        return self.active_streams.rows(now, changed | due)
+
+    def _evaluate_all(self, now=None):
+        """
+        Mark every stream in the active stream table due for evaluation by the next incremental check
+        """
+        if now is None:
+            now = datetime.datetime.utcnow()
+        for key in self.active_streams.streams:
+            self.transitions.schedule(key, now)
+
     def check_all(self):
-        active = get_active_streams(self.metadata_session)
-        changed = self._check_status(active)
-        rolled = self._add_rollup_status(changed)
-        self.save_pending(rolled)
+        with self.state_lock:
+            if self.shards is not None and self.shards.rebalance():
+                # streams may have moved to this instance, their statuses in the index may be stale (the
+                # previous owner may have changed them) so reload it, then re-evaluate every active stream
+                self.stream_index.invalidate()
+                self._evaluate_all()
+            try:
+                if self.config.get('INCREMENTAL_CHECK'):
+                    active = self.get_active_incremental()
+                else:
+                    active = get_active_streams(self.metadata_session)
+                if self.shards is not None:
+                    active = [row for row in active if self.shards.owns(ActiveStreamTable.key(row[0])[0])]
+                if self.config.get('VECTORIZED_CHECK'):
+                    changed = self._check_status_vectorized(list(active))
+                else:
+                    changed = self._check_status(active)
+                rolled = self._add_rollup_status(changed)
+                self.save_pending(rolled)
+            except Exception:
+                # the watermark and deadlines have already moved on past the streams this check
+                # failed to evaluate, force a full resync on the next check so none are missed
+                self.last_full_sync = None
+                raise
+
+    def snapshot_state(self):
+        """
+        :return: picklable copy of the in-memory stream state
+        """
+        with self.state_lock:
+            return {
+                'index': self.stream_index.dump(),
+                'active': self.active_streams.dump(),
+                'deadlines': self.transitions.dump(),
+                'last_full_sync': self.last_full_sync,
+            }
+
+    @stopwatch()
+    def write_snapshot(self):
+        """
+        Write the in-memory stream state to SNAPSHOT_PATH
+        """
+        path = self.config.get('SNAPSHOT_PATH')
+        if not path:
+            return
+        state = self.snapshot_state()
+        size = write_snapshot(path, state)
+        log.info('Wrote snapshot %s: %d deployed streams, %d active streams (%d bytes)',
+                 path, len(state['index']), len(state['active'][0]), size)
+
+    def restore_snapshot(self):
+        """
+        Load the in-memory stream state from SNAPSHOT_PATH so that the first checks run from memory, then
+        reconcile it against the databases in a background thread
+        :return: True if a snapshot was restored
+        """
+        path = self.config.get('SNAPSHOT_PATH')
+        if not path or not self.config.get('INCREMENTAL_CHECK'):
+            return False
+        state = read_snapshot(path, self.config.get('SNAPSHOT_MAX_AGE'))
+        if state is None:
+            return False
+
+        with self.state_lock:
+            self.stream_index.restore(state['index'])
+            records, watermark = state['active']
+            self.active_streams.restore(records, watermark)
+            self.transitions.restore(state['deadlines'])
+            self.last_full_sync = datetime.datetime.utcnow()
+        log.info('Restored snapshot %s from %s: %d deployed streams, %d active streams',
+                 path, state['created'], len(self.stream_index), len(self.active_streams))
+
+        reconciler = threading.Thread(target=self.reconcile, name='reconcile')
+        reconciler.daemon = True
+        reconciler.start()
+        return True
+
+    @stopwatch()
+    def reconcile(self):
+        """
+        Reload the deployed stream index and the complete active stream set, swap them in and
+        re-evaluate every active stream on the next check
+        """
+        try:
+            index = DeployedStreamIndex(self.refdes_cache)
+            with self.session.begin():
+                index.load(self.session)
+            rows = list(get_active_streams(self.metadata_session))
+        except Exception:
+            log.exception('Snapshot reconcile failed, forcing a full resync')
+            with self.state_lock:
+                self.last_full_sync = None
+            return
+        finally:
+            self.session.remove()
+            self.metadata_session.remove()
+
+        now = datetime.datetime.utcnow()
+        with self.state_lock:
+            self.stream_index.records = index.records
+            self.stream_index.loaded_time = index.loaded_time
+            changed = self.active_streams.update(rows, full=True)
+            self.last_full_sync = now
+            self.transitions.clear()
+            self._evaluate_all(now)
+        log.info('Reconciled snapshot: %d deployed streams, %d active streams (%d changed)',
+                 len(self.stream_index), len(self.active_streams), len(changed))
 
     def notify_all(self):
+        """
+        Deliver all pending updates to the events API. Superseded updates are first collapsed to the
+        latest per asset and stream (see NOTIFY_COALESCE). Updates are read in a short transaction and
+        posted concurrently (in order per asset), deletions and error counts are committed in batches
+        of NOTIFY_COMMIT_BATCH_SIZE as responses arrive.
+        """
+        if not self.is_leader():
+            return
         notifier = self.get_status_notifier()
+        batch_size = self.config.get('NOTIFY_COMMIT_BATCH_SIZE', 50)
+        coalesce = self.config.get('NOTIFY_COALESCE')
+        # notify runs alongside the other jobs, give it a session of its own
         session = self.session_factory()
 
         with session.begin():
-            for pu in session.query(PendingUpdate).order_by(PendingUpdate.id):
-                message = pu.message
-                uid = message.get('assetUid')
-                delete = False
-                if uid and message:
-                    try:
-                        response = notifier.post_event(uid, message)
-                        response.raise_for_status()
-                        status_code = response.status_code
-                        if status_code == 201:
-                            delete = True
-                        elif 400 <= status_code < 500:
-                            # client error - increment the error count
-                            log.error('Received client error from events API: (%d) %r',
-                                      status_code, response.content)
-                            pu.error_count += 1
-                            if pu.error_count > MAX_STATUS_POST_FAILURES:
-                                delete = True
-                        elif status_code >= 500:
-                            # server error - don't increment error count
-                            # log the problem
-                            log.error('Received server error from events API: (%d) %r',
-                                      status_code, response.content)
-                            continue
-                        else:
-                            # unknown response
-                            # log, but don't increment error count
-                            log.error('Received unexpected response from events API: (%d) %r',
-                                      status_code, response.content)
-                    except requests.exceptions.RequestException:
-                        # Don't count this as an error
-                        # we'll keep trying until we can connect to uframe
-                        continue
-                if delete:
-                    session.delete(pu)
+            if coalesce:
+                removed = coalesce_pending_updates(session, summarize=coalesce == 'summary')
+                if removed:
+                    log.info('Coalesced %d superseded pending updates', removed)
+            pending = session.query(PendingUpdate.id, PendingUpdate.message, PendingUpdate.error_count)
+            pending = pending.order_by(PendingUpdate.id).all()
+
+        error_counts = {}
+        events = []
+        for pu_id, message, error_count in pending:
+            uid = message.get('assetUid') if message else None
+            if uid:
+                error_counts[pu_id] = error_count
+                events.append((pu_id, uid, message))
+
+        deletes = []
+        errors = {}
+        for pu_id, response, error in notifier.post_events(events):
+            if error is not None:
+                # Don't count this as an error
+                # we'll keep trying until we can connect to uframe
+                continue
+
+            status_code = response.status_code
+            if status_code == 201:
+                deletes.append(pu_id)
+            elif 400 <= status_code < 500:
+                # client error - increment the error count
+                log.error('Received client error from events API: (%d) %r',
+                          status_code, response.content)
+                error_counts[pu_id] += 1
+                if error_counts[pu_id] > MAX_STATUS_POST_FAILURES:
+                    deletes.append(pu_id)
+                else:
+                    errors[pu_id] = error_counts[pu_id]
+            elif status_code >= 500:
+                # server error - don't increment error count
+                # log the problem
+                log.error('Received server error from events API: (%d) %r',
+                          status_code, response.content)
+            else:
+                # unknown response
+                # log, but don't increment error count
+                log.error('Received unexpected response from events API: (%d) %r',
+                          status_code, response.content)
+
+            if len(deletes) + len(errors) >= batch_size:
+                self._save_notify_results(session, deletes, errors)
+                deletes = []
+                errors = {}
+
+        self._save_notify_results(session, deletes, errors)
+        log.info('Events API circuit breaker: %r', notifier.breaker.as_dict())
+
+    def _save_notify_results(self, session, deletes, errors):
+        """
+        Delete delivered pending updates and store new error counts in a single short transaction
+        :param session: session owned by the notify job
+        :param deletes: list of PendingUpdate ids
+        :param errors: dictionary of PendingUpdate id -> error count
+        """
+        if not deletes and not errors:
+            return
+
+        table = PendingUpdate.__table__
+        with session.begin():
+            if deletes:
+                session.execute(table.delete().where(table.c.id.in_(deletes)))
+            if errors:
+                statement = table.update().where(table.c.id == bindparam('pu_id'))
+                statement = statement.values(error_count=bindparam('count'))
+                session.execute(statement, [{'pu_id': pu_id, 'count': count} for pu_id, count in errors.items()])
+
+
+def resample_shard(url, refdes_ids, start, end, seconds=3600):
+    """
+    Resample the port counts for a set of reference designators. Creates its own engine so that it may be
+    run in a worker process. Each reference designator is resampled in its own transaction.
+    :param url: monitor database URL
+    :param refdes_ids: list of ReferenceDesignator ids
+    :param start: datetime object representing the lower time bound
+    :param end: datetime object representing the upper time bound
+    :param seconds: resample period
+    :return: dictionary summarizing the number of reference designators, records read and written and elapsed time
+    """
+    started = time.time()
+    engine = create_engine(url)
+    session = sessionmaker(bind=engine, autocommit=True)()
+    read = written = 0
+    try:
+        for refdes_id in refdes_ids:
+            with session.begin():
+                counts_df = get_port_rates_dataframe(session, refdes_id, start, end)
+                resampled = resample_port_count(session, refdes_id, counts_df, seconds)
+            read += len(counts_df)
+            if resampled is not None:
+                written += len(resampled)
+    finally:
+        session.close()
+        engine.dispose()
+
+    return {
+        'refdes': len(refdes_ids),
+        'read': read,
+        'written': written,
+        'elapsed': time.time() - started
+    }
 
 
 @click.command()
 @click.option('--expected', type=click.Path(exists=True, dir_okay=False),
               help='CSV file with expected rates and timeouts')
 def main(expected):
-    config = Config(here)
-    config.from_object('ooi_status.default_settings')
-    if 'OOISTATUS_SETTINGS' in os.environ:
-        config.from_envvar('OOISTATUS_SETTINGS')
+    config = load_config()
 
     for key in config:
         log.info('OOI_STATUS CONFIG: %r: %r', key, config[key])
@@ -216,12 +596,31 @@ def main(expected):
         monitor.read_expected_csv(expected)
 
     else:
-        scheduler = BlockingScheduler()
+        scheduler = MonitorScheduler(misfire_grace_time=config.get('SCHEDULER_MISFIRE_GRACE_SECONDS', 30))
         log.info('adding jobs')
 
-        # notify on change every minute
-        scheduler.add_job(monitor.check_all, 'cron', second=0)
-        scheduler.add_job(monitor.notify_all, 'cron', second=10)
+        # notify on change every minute, stretching the check interval if checks overrun
+        adaptive = AdaptiveInterval(60, overrun_limit=config.get('CHECK_OVERRUN_LIMIT', 3),
+                                    max_period=config.get('CHECK_MAX_INTERVAL', 600))
+        scheduler.add_job(monitor.check_all, 'check_all', CronTrigger(second=0), adaptive=adaptive)
+        scheduler.add_job(monitor.notify_all, 'notify_all', 'cron', second=10)
+        # roll up port counts every hour
+        if config.get('PORT_COUNT_RESAMPLER') == 'pandas':
+            monitor.start_resample_pool()
+            scheduler.add_job(monitor.resample_count_data_hourly, 'resample_port_counts', 'cron', minute=5, second=30)
+        else:
+            scheduler.add_job(monitor.downsample_port_counts, 'downsample_port_counts', 'cron', minute=5, second=30)
+        # keep port_count partitions ahead of incoming data
+        if config.get('PORT_COUNT_PARTITIONED'):
+            scheduler.add_job(monitor.maintain_port_count_partitions, 'maintain_partitions', 'cron',
+                              hour=0, minute=15)
+        # periodically save the in-memory stream state for warm restarts
+        if config.get('SNAPSHOT_PATH'):
+            monitor.restore_snapshot()
+            scheduler.add_job(monitor.write_snapshot, 'write_snapshot', 'interval',
+                              seconds=config.get('SNAPSHOT_INTERVAL', 300))
+        scheduler.add_job(scheduler.log_stats, 'log_stats', 'interval',
+                          seconds=config.get('SCHEDULER_STATS_SECONDS', 600))
         log.info('starting jobs')
         scheduler.start()
 
@@ -0,0 +1,139 @@
+import datetime
+from collections import namedtuple
+
+import pandas as pd
+from ooi_data.postgres.model import DeployedStream, ExpectedStream, ReferenceDesignator, StatusEnum
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+StreamRecord = namedtuple('StreamRecord', 'id refdes stream method status expected_rate warn_interval fail_interval')
+
+
+def deployed_stream_query(session):
+    """
+    Query returning a StreamRecord compatible tuple for every deployed stream with the
+    effective thresholds (deployed overrides applied)
+    """
+    deployed = DeployedStream.__table__.c
+    return session.query(
+        deployed.id,
+        ReferenceDesignator.name.label('refdes'),
+        ExpectedStream.name.label('stream'),
+        ExpectedStream.method.label('method'),
+        deployed.status,
+        func.coalesce(deployed.expected_rate, ExpectedStream.expected_rate).label('expected_rate'),
+        func.coalesce(deployed.warn_interval, ExpectedStream.warn_interval).label('warn_interval'),
+        func.coalesce(deployed.fail_interval, ExpectedStream.fail_interval).label('fail_interval')
+    ).select_from(DeployedStream).join(ExpectedStream, ReferenceDesignator)
+
+
+class DeployedStreamIndex(object):
+    """
+    In-memory index of every DeployedStream keyed by (refdes, stream, method).
+
+    The index is bulk loaded with a single query and holds plain StreamRecord tuples rather than
+    ORM instances, so it is unaffected by session state and holds the entire fleet. It is reloaded
+    every refresh_seconds to pick up changes made through the API. Streams which do not yet exist
+    are created in bulk by ensure().
+    """
+    def __init__(self, refdes_cache, refresh_seconds=300):
+        self.refdes_cache = refdes_cache
+        self.refresh_interval = datetime.timedelta(seconds=refresh_seconds)
+        self.records = {}
+        self.loaded_time = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, key):
+        return key in self.records
+
+    def get(self, key):
+        return self.records.get(key)
+
+    def load(self, session):
+        records = {}
+        for row in deployed_stream_query(session):
+            record = StreamRecord(*row)
+            records[(record.refdes, record.stream, record.method)] = record
+        self.records = records
+        self.loaded_time = datetime.datetime.utcnow()
+
+    def invalidate(self):
+        self.loaded_time = None
+
+    def dump(self):
+        """
+        :return: list of plain record tuples suitable for pickling
+        """
+        return [tuple(record) for record in self.records.values()]
+
+    def restore(self, records, loaded_time=None):
+        """
+        Replace the index contents, treating them as loaded at loaded_time (default now)
+        """
+        index = {}
+        for record in records:
+            record = StreamRecord(*record)
+            index[(record.refdes, record.stream, record.method)] = record
+        self.records = index
+        self.loaded_time = loaded_time or datetime.datetime.utcnow()
+
+    def refresh(self, session, now=None):
+        """
+        Reload the index if it has never been loaded or is older than the refresh interval
+        """
+        if now is None:
+            now = datetime.datetime.utcnow()
+        if self.loaded_time is None or now - self.loaded_time >= self.refresh_interval:
+            self.load(session)
+
+    def set_status(self, key, status):
+        self.records[key] = self.records[key]._replace(status=status)
+
+    def frame(self):
+        """
+        :return: pandas DataFrame of all records
+        """
+        return pd.DataFrame(list(self.records.values()), columns=StreamRecord._fields)
+
+    def ensure(self, session, keys):
+        """
+        Create any deployed streams (and their reference designators and expected streams) which
+        are not already in the index, using a single INSERT ... ON CONFLICT DO NOTHING per table.
+        New expected streams are created with zero thresholds (not tracked) and new deployed
+        streams start out not tracked.
+        :param session: sqlalchemy session object
+        :param keys: iterable of (refdes, stream, method)
+        """
+        missing = set(keys).difference(self.records)
+        if not missing:
+            return
+
+        refdes_ids = self.refdes_cache.get_ids(session, (refdes for refdes, _, _ in missing))
+
+        expected = ExpectedStream.__table__
+        pairs = set((stream, method) for _, stream, method in missing)
+        statement = insert(expected).values([{'name': stream, 'method': method, 'expected_rate': 0,
+                                               'warn_interval': 0, 'fail_interval': 0}
+                                              for stream, method in pairs])
+        session.execute(statement.on_conflict_do_nothing(index_elements=['name', 'method']))
+        query = session.query(expected.c.name, expected.c.method, expected.c.id)
+        query = query.filter(tuple_(expected.c.name, expected.c.method).in_(list(pairs)))
+        expected_ids = {(name, method): expected_id for name, method, expected_id in query}
+
+        now = datetime.datetime.utcnow()
+        deployed = DeployedStream.__table__
+        statement = insert(deployed).values([{'reference_designator_id': refdes_ids[refdes],
+                                              'expected_stream_id': expected_ids[(stream, method)],
+                                              'status': StatusEnum.NOT_TRACKED,
+                                              'status_time': now}
+                                             for refdes, stream, method in missing])
+        session.execute(statement.on_conflict_do_nothing(
+            index_elements=['reference_designator_id', 'expected_stream_id']))
+
+        query = deployed_stream_query(session).filter(
+            tuple_(ReferenceDesignator.name, ExpectedStream.name, ExpectedStream.method).in_(list(missing)))
+        for row in query:
+            record = StreamRecord(*row)
+            self.records[(record.refdes, record.stream, record.method)] = record
@@ -0,0 +1,78 @@
+import datetime
+import heapq
+
+
+class TransitionScheduler(object):
+    """
+    Min-heap of the time at which each stream will next cross its warn or fail interval.
+
+    A stream can only change status when new data arrives or when the time since its last
+    particle passes one of its thresholds. Keeping the next threshold crossing for each stream
+    allows the monitor to evaluate only the streams which are due, rather than the whole fleet.
+    Rescheduling a stream leaves its previous heap entry in place, stale entries are discarded
+    when popped and the heap is rebuilt if they come to dominate it.
+    """
+    def __init__(self):
+        self._heap = []
+        self._deadlines = {}
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    @staticmethod
+    def next_deadline(last, elapsed, warn_interval, fail_interval):
+        """
+        Compute the next time at which a stream's status may change without new data arriving
+        :param last: time of the last particle received
+        :param elapsed: time elapsed since the last particle (timedelta)
+        :param warn_interval: warning threshold in seconds (0 or None if unused)
+        :param fail_interval: failure threshold in seconds (0 or None if unused)
+        :return: datetime of the next threshold crossing or None if there are no further thresholds
+        """
+        seconds = elapsed.total_seconds()
+        for interval in sorted(i for i in (warn_interval, fail_interval) if i):
+            if interval >= seconds:
+                return last + datetime.timedelta(seconds=interval)
+        return None
+
+    def schedule(self, key, deadline):
+        """
+        Set (or clear, if deadline is None) the next evaluation time for a stream
+        """
+        if deadline is None:
+            self._deadlines.pop(key, None)
+            return
+
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+        if len(self._heap) > 2 * len(self._deadlines) + 1000:
+            self._heap = [(d, k) for k, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def pop_due(self, now):
+        """
+        Remove and return all streams whose deadline is at or before now
+        :return: set of stream keys
+        """
+        due = set()
+        while self._heap and self._heap[0][0] <= now:
+            deadline, key = heapq.heappop(self._heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                due.add(key)
+        return due
+
+    def clear(self):
+        self._heap = []
+        self._deadlines = {}
+
+    def dump(self):
+        """
+        :return: dictionary of stream key -> deadline
+        """
+        return dict(self._deadlines)
+
+    def restore(self, deadlines):
+        self._deadlines = dict(deadlines)
+        self._heap = [(d, k) for k, d in self._deadlines.items()]
+        heapq.heapify(self._heap)
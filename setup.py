@@ -11,6 +11,8 @@ setup(
     entry_points={
           'console_scripts': [
               'ooi_status_monitor=ooi_status.status_monitor:main',
+              'ooi_status_ingest=ooi_status.amqp_client:main',
+              'ooi_status_partitions=ooi_status.partitions:main',
           ],
       },
 )
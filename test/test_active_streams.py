@@ -0,0 +1,43 @@
+import datetime
+import unittest
+from collections import namedtuple
+
+from ooi_status.active_streams import ActiveStreamTable
+
+StreamMetadatum = namedtuple('StreamMetadatum', 'refdes stream method last')
+
+
+class ActiveStreamTableTest(unittest.TestCase):
+    def setUp(self):
+        self.now = datetime.datetime(2017, 2, 1, 12, 0)
+        self.table = ActiveStreamTable(lookback_seconds=600)
+        self.ctd = StreamMetadatum('CE04OSBP-LJ01C-06-CTDBPO108', 'ctdbp_no_sample', 'streamed',
+                                   self.now - datetime.timedelta(seconds=30))
+        self.adcp = StreamMetadatum('RS03AXPS-PC03A-06-VADCPA301', 'adcp_engineering', 'streamed',
+                                    self.now - datetime.timedelta(hours=2))
+
+    def test_incremental_update(self):
+        changed = self.table.update([(self.ctd, None, 'uid1'), (self.adcp, None, 'uid2')], full=True)
+        self.assertEqual(len(changed), 2)
+        self.assertEqual(self.table.since(), self.ctd.last - datetime.timedelta(seconds=600))
+
+        moved = self.ctd._replace(last=self.now)
+        changed = self.table.update([(moved, None, 'uid1')])
+        self.assertEqual(changed, {(moved.refdes, moved.stream, moved.method)})
+        self.assertEqual(len(self.table), 2)
+
+        rows = {record.refdes: elapsed for record, elapsed, uid in self.table.rows(self.now)}
+        self.assertEqual(rows[self.ctd.refdes], datetime.timedelta(0))
+        self.assertEqual(rows[self.adcp.refdes], datetime.timedelta(hours=2))
+
+    def test_full_update_drops_inactive(self):
+        self.table.update([(self.ctd, None, 'uid1'), (self.adcp, None, 'uid2')], full=True)
+        changed = self.table.update([(self.ctd, None, 'uid1')], full=True)
+        self.assertEqual(changed, set())
+        self.assertEqual(len(self.table), 1)
+
+    def test_future_last_does_not_move_watermark(self):
+        skewed = self.adcp._replace(last=self.now + datetime.timedelta(days=1))
+        self.table.update([(self.ctd, None, 'uid1'), (skewed, None, 'uid2')], full=True, now=self.now)
+        self.assertEqual(self.table.since(), self.ctd.last - datetime.timedelta(seconds=600))
+        self.assertEqual(len(self.table), 2)
@@ -0,0 +1,170 @@
+import calendar
+import datetime
+import json
+import unittest
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine
+
+from ooi_status.amqp_client import AmqpStatsClient
+
+START = datetime.datetime(2017, 2, 1, 12, 0)
+
+
+class FakeMessage(object):
+    def __init__(self, name):
+        self.name = name
+        self.acks = []
+        self.requeued = False
+
+    def ack(self, multiple=False):
+        self.acks.append(multiple)
+
+    def requeue(self):
+        self.requeued = True
+
+
+class FakeSession(object):
+    def __init__(self):
+        self.inserts = []
+        self.fail = False
+
+    @contextmanager
+    def begin(self):
+        yield
+
+    def execute(self, statement, values):
+        if self.fail:
+            raise RuntimeError('insert failed')
+        self.inserts.append(values)
+
+
+class FakeReferenceDesignatorCache(object):
+    def __init__(self):
+        self.invalidated = 0
+
+    def get_ids(self, session, names):
+        return {name: index for index, name in enumerate(sorted(set(names)))}
+
+    def invalidate(self):
+        self.invalidated += 1
+
+
+def stats_body(refdes, seconds, byte_count=100):
+    collected = START + datetime.timedelta(seconds=seconds)
+    return json.dumps({'reference_designator': refdes, 'end_time': calendar.timegm(collected.utctimetuple()),
+                       'bytes_in': byte_count, 'elapsed': 10})
+
+
+class AmqpStatsClientTest(unittest.TestCase):
+    def create_client(self, **kwargs):
+        client = AmqpStatsClient('memory://', 'port_agent_stats', create_engine('sqlite://'), **kwargs)
+        client.session = FakeSession()
+        client.refdes_cache = FakeReferenceDesignatorCache()
+        return client
+
+    def receive(self, client, refdes, seconds):
+        message = FakeMessage('%s@%d' % (refdes, seconds))
+        client.on_message(stats_body(refdes, seconds), message)
+        return message
+
+    def test_batch_acked_after_insert(self):
+        client = self.create_client(batch_size=3, flush_interval=3600)
+        messages = [self.receive(client, 'A', 10), self.receive(client, 'B', 20)]
+        self.assertEqual(client.session.inserts, [])
+
+        messages.append(self.receive(client, 'A', 30))
+        self.assertEqual(len(client.session.inserts), 1)
+        self.assertEqual(len(client.session.inserts[0]), 3)
+        # a single multiple-ack on the last message of the batch
+        self.assertEqual([message.acks for message in messages], [[], [], [True]])
+        self.assertFalse(any(message.requeued for message in messages))
+        self.assertEqual(client._unacked, [])
+        self.assertEqual(client._received, 0)
+
+    def test_failed_insert_requeues_batch(self):
+        client = self.create_client(batch_size=3, flush_interval=3600)
+        client.session.fail = True
+        messages = [self.receive(client, 'A', seconds) for seconds in (10, 20, 30)]
+
+        self.assertTrue(all(message.requeued for message in messages))
+        self.assertEqual([message.acks for message in messages], [[], [], []])
+        self.assertEqual(client.refdes_cache.invalidated, 1)
+        self.assertEqual(client._unacked, [])
+        self.assertEqual(client._received, 0)
+
+    def test_partial_batch_flushed_on_interval(self):
+        client = self.create_client(batch_size=100, flush_interval=0)
+        message = self.receive(client, 'A', 10)
+        client.on_iteration()
+        self.assertEqual(len(client.session.inserts), 1)
+        self.assertEqual(message.acks, [True])
+
+        # nothing pending, nothing written
+        client.on_iteration()
+        self.assertEqual(len(client.session.inserts), 1)
+
+
+class AggregatingAmqpStatsClientTest(AmqpStatsClientTest):
+    def create_client(self, **kwargs):
+        kwargs.setdefault('aggregate_seconds', 60)
+        kwargs.setdefault('aggregate_grace', 30)
+        return super(AggregatingAmqpStatsClientTest, self).create_client(**kwargs)
+
+    def test_batch_acked_after_insert(self):
+        # records are held until their bucket closes, nothing can be acked before then
+        client = self.create_client(batch_size=3, flush_interval=3600)
+        messages = [self.receive(client, 'A', seconds) for seconds in (10, 20, 30)]
+        self.assertEqual(client.session.inserts, [])
+        self.assertEqual([message.acks for message in messages], [[], [], []])
+        self.assertEqual(len(client._unacked), 3)
+        self.assertEqual(client._received, 0)
+
+    def test_failed_insert_requeues_batch(self):
+        client = self.create_client(batch_size=100, flush_interval=3600)
+        client.session.fail = True
+        messages = [self.receive(client, 'A', seconds) for seconds in (10, 20, 150)]
+        client.flush()
+
+        self.assertTrue(all(message.requeued for message in messages))
+        self.assertEqual([message.acks for message in messages], [[], [], []])
+        self.assertEqual(len(client.aggregator), 0)
+        self.assertEqual(client._unacked, [])
+
+    def test_partial_batch_flushed_on_interval(self):
+        client = self.create_client(batch_size=100, flush_interval=0)
+        message = self.receive(client, 'A', 10)
+        closing = self.receive(client, 'B', 100)
+        client.on_iteration()
+        self.assertEqual(client.session.inserts, [[{'reference_designator_id': 0, 'collected_time': START,
+                                                    'byte_count': 100, 'seconds': 10}]])
+        self.assertEqual(message.acks, [True])
+        self.assertEqual(closing.acks, [])
+
+    def test_closed_buckets_behind_open_bucket(self):
+        client = self.create_client(batch_size=100, flush_interval=3600)
+        # buckets A@12:00 and B@12:01, the message at 12:01:40 closes A@12:00 but not B@12:01
+        first = self.receive(client, 'A', 10)
+        open_first = self.receive(client, 'B', 70)
+        behind = self.receive(client, 'A', 20)
+        open_second = self.receive(client, 'B', 100)
+        client.flush()
+
+        self.assertEqual(client.session.inserts, [[{'reference_designator_id': 0, 'collected_time': START,
+                                                    'byte_count': 200, 'seconds': 20}]])
+        # the leading run with a multiple-ack, the committed message behind the open bucket on its own
+        self.assertEqual(first.acks, [True])
+        self.assertEqual(behind.acks, [False])
+        self.assertEqual(open_first.acks, [])
+        self.assertEqual(open_second.acks, [])
+        self.assertEqual([message for message, _ in client._unacked], [open_first, open_second])
+
+        # a failed write requeues only the messages whose data was not stored
+        client.session.fail = True
+        late = self.receive(client, 'A', 200)
+        client.flush()
+        self.assertTrue(all(message.requeued for message in (open_first, open_second, late)))
+        self.assertFalse(first.requeued or behind.requeued)
+        self.assertEqual((first.acks, behind.acks), ([True], [False]))
+        self.assertEqual(client._unacked, [])
+        self.assertEqual(len(client.aggregator), 0)
@@ -0,0 +1,110 @@
+import datetime
+import unittest
+
+from flask import Flask, jsonify
+
+from ooi_status.api.cache import ResponseCache, StatusVersion, cached_response, conditional_response
+
+
+class VersionResult(object):
+    def __init__(self, version, modified):
+        self.row = (version, modified)
+
+    def first(self):
+        return self.row
+
+
+class VersionSession(object):
+    """
+    Minimal session returning a settable status version
+    """
+    def __init__(self):
+        self.version = 1
+        self.modified = datetime.datetime(2017, 2, 1, 12, 0, 0, 500)
+        self.queries = 0
+
+    def execute(self, statement):
+        self.queries += 1
+        return VersionResult(self.version, self.modified)
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.session = VersionSession()
+        self.cache = ResponseCache(maxsize=2, status_version=StatusVersion(ttl=0))
+
+    def test_version_change_clears(self):
+        self.assertEqual(self.cache.get_version(self.session), 1)
+        self.cache.set('a', b'{}')
+        self.assertEqual(self.cache.get('a'), b'{}')
+
+        self.cache.get_version(self.session)
+        self.assertEqual(self.cache.get('a'), b'{}')
+
+        self.session.version = 2
+        self.assertEqual(self.cache.get_version(self.session), 2)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_version_ttl(self):
+        cache = ResponseCache(status_version=StatusVersion(ttl=60))
+        cache.get_version(self.session)
+        cache.get_version(self.session)
+        self.assertEqual(self.session.queries, 1)
+        cache.clear()
+        cache.get_version(self.session)
+        self.assertEqual(self.session.queries, 2)
+
+    def test_lru(self):
+        for key in 'abc':
+            self.cache.set(key, key)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('c'), 'c')
+
+
+class ConditionalResponseTest(unittest.TestCase):
+    def setUp(self):
+        self.app = app = Flask(__name__)
+        app.session = VersionSession()
+        status_version = StatusVersion(ttl=0)
+        self.calls = []
+
+        @app.route('/stream')
+        @conditional_response(app, status_version)
+        @cached_response(app, ResponseCache(status_version=status_version))
+        def streams():
+            self.calls.append(1)
+            return jsonify({'streams': [1, 2, 3]})
+
+        self.client = app.test_client()
+
+    def test_etag(self):
+        response = self.client.get('/stream?status=failed')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertEqual(response.headers['Last-Modified'], 'Wed, 01 Feb 2017 12:00:00 GMT')
+
+        response = self.client.get('/stream?status=failed', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(len(self.calls), 1)
+
+        self.app.session.version = 2
+        response = self.client.get('/stream?status=failed', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_if_modified_since(self):
+        headers = {'If-Modified-Since': 'Wed, 01 Feb 2017 12:00:00 GMT'}
+        self.assertEqual(self.client.get('/stream', headers=headers).status_code, 304)
+        headers = {'If-Modified-Since': 'Wed, 01 Feb 2017 11:59:59 GMT'}
+        self.assertEqual(self.client.get('/stream', headers=headers).status_code, 200)
+
+    def test_cached(self):
+        first = self.client.get('/stream')
+        second = self.client.get('/stream')
+        self.assertEqual(first.get_data(), second.get_data())
+        self.assertEqual(len(self.calls), 1)
+        self.client.get('/stream?method=streamed')
+        self.assertEqual(len(self.calls), 2)
@@ -0,0 +1,72 @@
+import threading
+import unittest
+from collections import namedtuple
+
+from ooi_status.event_notifier import CircuitBreaker, EventNotifier
+
+FakeResponse = namedtuple('FakeResponse', 'status_code content')
+
+
+class RecordingNotifier(EventNotifier):
+    def __init__(self, responses):
+        super(RecordingNotifier, self).__init__(None, 'http://localhost', max_workers=4)
+        self.responses = responses
+        self.posted = []
+        self.lock = threading.Lock()
+
+    def post_event(self, uid, body):
+        with self.lock:
+            self.posted.append((uid, body))
+        return FakeResponse(self.responses.get(body, 201), '')
+
+
+class EventNotifierTest(unittest.TestCase):
+    def test_post_events_preserves_asset_order(self):
+        notifier = RecordingNotifier({})
+        events = [(i, 'uid%d' % (i % 3), i) for i in range(30)]
+        results = list(notifier.post_events(events))
+
+        self.assertEqual(sorted(key for key, _, _ in results), list(range(30)))
+        for uid in ('uid0', 'uid1', 'uid2'):
+            bodies = [body for posted_uid, body in notifier.posted if posted_uid == uid]
+            self.assertEqual(bodies, sorted(bodies))
+
+    def test_post_events_stops_asset_on_server_error(self):
+        notifier = RecordingNotifier({1: 503})
+        events = [(0, 'a', 0), (1, 'a', 1), (2, 'a', 2), (3, 'b', 3)]
+        results = {key: response.status_code for key, response, _ in notifier.post_events(events)}
+        self.assertEqual(results, {0: 201, 1: 503, 3: 201})
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_open_and_probe(self):
+        breaker = CircuitBreaker(failure_threshold=2, base_delay=10, max_delay=30)
+        breaker.record_failure(now=0)
+        self.assertTrue(breaker.allow(now=0))
+        breaker.record_failure(now=0)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow(now=5))
+
+        # single probe once the delay has passed
+        self.assertTrue(breaker.allow(now=10))
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow(now=10))
+
+        # failed probe doubles the delay
+        breaker.record_failure(now=10)
+        self.assertFalse(breaker.allow(now=29))
+        self.assertTrue(breaker.allow(now=30))
+        breaker.record_success()
+        self.assertTrue(breaker.closed)
+        self.assertEqual(breaker.as_dict()['times_opened'], 2)
+
+    def test_open_breaker_sends_single_probe(self):
+        notifier = RecordingNotifier({0: 503})
+        notifier.breaker = CircuitBreaker(failure_threshold=1, base_delay=0)
+        list(notifier.post_events([(0, 'a', 0)]))
+        self.assertFalse(notifier.breaker.closed)
+
+        notifier.responses = {}
+        results = list(notifier.post_events([(i, 'uid%d' % i, i) for i in range(5)]))
+        self.assertEqual(len(results), 5)
+        self.assertTrue(notifier.breaker.closed)
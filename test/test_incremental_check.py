@@ -0,0 +1,54 @@
+import datetime
+import unittest
+from collections import namedtuple
+
+from ooi_status import status_monitor
+from ooi_status.active_streams import ActiveStreamTable
+from ooi_status.status_monitor import StatusMonitor
+
+StreamMetadatum = namedtuple('StreamMetadatum', 'refdes stream method last')
+
+
+class IncrementalCheckTest(unittest.TestCase):
+    def setUp(self):
+        now = datetime.datetime.utcnow()
+        self.ctd = StreamMetadatum('CE04OSBP-LJ01C-06-CTDBPO108', 'ctdbp_no_sample', 'streamed',
+                                   now - datetime.timedelta(seconds=30))
+        self.adcp = StreamMetadatum('RS03AXPS-PC03A-06-VADCPA301', 'adcp_engineering', 'streamed',
+                                    now - datetime.timedelta(hours=2))
+        self.active = [(self.ctd, None, 'uid1'), (self.adcp, None, 'uid2')]
+
+        self.get_active_streams = status_monitor.get_active_streams
+        status_monitor.get_active_streams = lambda session, since=None: list(self.active)
+
+        self.monitor = StatusMonitor({'MONITOR_URL': 'sqlite://', 'METADATA_URL': 'sqlite://',
+                                      'INCREMENTAL_CHECK': True})
+        self.monitor._add_rollup_status = lambda messages: messages
+        self.monitor.save_pending = lambda messages: None
+        self.evaluated = []
+
+    def tearDown(self):
+        status_monitor.get_active_streams = self.get_active_streams
+
+    def check_status(self, rows):
+        self.evaluated.append({ActiveStreamTable.key(row[0]) for row in rows})
+        return []
+
+    def fail_check_status(self, rows):
+        raise RuntimeError('monitor database unavailable')
+
+    def test_failed_check_is_retried(self):
+        # a failure after the active streams were fetched must not lose them until the next full resync
+        self.monitor._check_status = self.fail_check_status
+        self.assertRaises(RuntimeError, self.monitor.check_all)
+
+        self.monitor._check_status = self.check_status
+        self.monitor.check_all()
+        self.assertEqual(self.evaluated, [{ActiveStreamTable.key(self.ctd), ActiveStreamTable.key(self.adcp)}])
+
+    def test_unchanged_streams_are_skipped(self):
+        self.monitor._check_status = self.check_status
+        self.monitor.check_all()
+        self.monitor.check_all()
+        self.assertEqual(len(self.evaluated), 2)
+        self.assertEqual(self.evaluated[1], set())
@@ -0,0 +1,70 @@
+import base64
+import unittest
+
+from flask import Flask
+from werkzeug.exceptions import BadRequest
+
+from ooi_status.api.pagination import ID, NAME, add_next_link, decode_cursor, encode_cursor, get_page_args
+
+
+class CursorTest(unittest.TestCase):
+    def test_round_trip(self):
+        key = ['RS03AXPS-PC03A-4A-CTDPFA303', 'ctdpf_optode_sample', 'streamed']
+        cursor = encode_cursor(key)
+        self.assertNotIn('RS03AXPS', cursor)
+        self.assertEqual(decode_cursor(cursor, (NAME, NAME, NAME)), key)
+        self.assertEqual(decode_cursor(encode_cursor([42]), (ID,)), [42])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, decode_cursor, 'not a cursor', (ID,))
+        self.assertRaises(ValueError, decode_cursor, encode_cursor([1, 2]), (ID,))
+        self.assertRaises(ValueError, decode_cursor, base64.urlsafe_b64encode(b'{"id": 1}').decode('ascii'), (ID,))
+
+    def test_invalid_types(self):
+        self.assertRaises(ValueError, decode_cursor, encode_cursor(['42']), (ID,))
+        self.assertRaises(ValueError, decode_cursor, encode_cursor([True]), (ID,))
+        self.assertRaises(ValueError, decode_cursor, encode_cursor([1.5]), (ID,))
+        self.assertRaises(ValueError, decode_cursor, encode_cursor(['a', 'b', None]), (NAME, NAME, NAME))
+        self.assertRaises(ValueError, decode_cursor, encode_cursor([{}]), (NAME,))
+
+
+class PageArgsTest(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['API_PAGE_SIZE'] = None
+        self.app.config['API_MAX_PAGE_SIZE'] = 100
+
+        @self.app.route('/stream')
+        def streams():
+            pass
+
+    def page_args(self, query, key_types=(ID,)):
+        with self.app.test_request_context('/stream' + query):
+            return get_page_args(self.app, key_types)
+
+    def test_unpaginated(self):
+        self.assertEqual(self.page_args(''), (None, None))
+
+    def test_limit(self):
+        self.assertEqual(self.page_args('?limit=10'), (10, None))
+        self.assertEqual(self.page_args('?limit=1000'), (100, None))
+        self.assertRaises(BadRequest, self.page_args, '?limit=0')
+        self.assertRaises(BadRequest, self.page_args, '?limit=ten')
+
+    def test_cursor(self):
+        cursor = encode_cursor([5])
+        self.assertEqual(self.page_args('?cursor=' + cursor), (100, [5]))
+        self.assertRaises(BadRequest, self.page_args, '?cursor=' + cursor, (NAME, NAME, NAME))
+        self.assertRaises(BadRequest, self.page_args, '?cursor=' + cursor, (NAME,))
+
+    def test_default_page_size(self):
+        self.app.config['API_PAGE_SIZE'] = 20
+        self.assertEqual(self.page_args(''), (20, None))
+
+    def test_next_link(self):
+        with self.app.test_request_context('/stream?limit=10&status=failed'):
+            response = add_next_link(self.app.response_class(), 'abc')
+            self.assertIn('rel="next"', response.headers['Link'])
+            self.assertIn('cursor=abc', response.headers['Link'])
+            self.assertIn('status=failed', response.headers['Link'])
+            self.assertNotIn('Link', add_next_link(self.app.response_class(), None).headers)
@@ -0,0 +1,44 @@
+import datetime
+import unittest
+
+from ooi_status.partitions import add_months, create_partition, month_start, partition_month, partition_name
+
+
+class RecordingConnection(object):
+    rowcount = 0
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, **params):
+        self.statements.append(str(statement).strip())
+        return self
+
+
+class PartitionsTest(unittest.TestCase):
+    def test_add_months(self):
+        dt = datetime.datetime(2017, 11, 17, 12, 30)
+        self.assertEqual(add_months(dt, 0), datetime.datetime(2017, 11, 1))
+        self.assertEqual(add_months(dt, 2), datetime.datetime(2018, 1, 1))
+        self.assertEqual(add_months(dt, -11), datetime.datetime(2016, 12, 1))
+        self.assertEqual(month_start(dt), datetime.datetime(2017, 11, 1))
+
+    def test_partition_name(self):
+        month = datetime.datetime(2018, 3, 1)
+        self.assertEqual(partition_name(month), 'port_count_y2018m03')
+        self.assertEqual(partition_month(partition_name(month)), month)
+        self.assertIsNone(partition_month('port_count_default'))
+
+    def test_create_partition(self):
+        conn = RecordingConnection()
+        create_partition(conn, datetime.datetime(2018, 3, 1))
+        self.assertEqual(len(conn.statements), 1)
+        self.assertIn('PARTITION OF port_count', conn.statements[0])
+
+    def test_create_partition_with_default(self):
+        # records in the default partition must be moved out before the partition is attached
+        conn = RecordingConnection()
+        create_partition(conn, datetime.datetime(2018, 3, 1), has_default=True)
+        self.assertEqual(len(conn.statements), 3)
+        self.assertIn('DELETE FROM port_count_default', conn.statements[1])
+        self.assertIn('ATTACH PARTITION port_count_y2018m03', conn.statements[2])
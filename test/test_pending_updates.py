@@ -0,0 +1,86 @@
+import unittest
+
+from ooi_data.postgres import model
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy_utils import database_exists, create_database
+
+from ooi_status.queries import coalesce_pending_updates
+
+
+class CoalescePendingUpdatesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine('postgresql+psycopg2://monitor@localhost/monitor_test')
+
+        if not database_exists(cls.engine.url):
+            create_database(cls.engine.url, template='template_postgis')
+
+        model.create_database(cls.engine, drop=True)
+        cls.session = sessionmaker(bind=cls.engine)()
+
+        cls.statements = []
+        event.listen(cls.engine, 'before_cursor_execute', cls.count_statement)
+
+    @classmethod
+    def tearDownClass(cls):
+        event.remove(cls.engine, 'before_cursor_execute', cls.count_statement)
+        cls.session.close()
+
+    @classmethod
+    def count_statement(cls, conn, cursor, statement, parameters, context, executemany):
+        cls.statements.append(statement)
+
+    def setUp(self):
+        self.session.query(model.PendingUpdate).delete()
+        self.session.commit()
+
+    def add_updates(self, *messages):
+        updates = [model.PendingUpdate(message=message) for message in messages]
+        self.session.add_all(updates)
+        self.session.commit()
+        return [update.id for update in updates]
+
+    def coalesce(self, summarize=False):
+        removed = coalesce_pending_updates(self.session, summarize=summarize)
+        self.session.commit()
+        self.session.expire_all()
+        return removed
+
+    def remaining(self):
+        return {pu.id: pu.message for pu in self.session.query(model.PendingUpdate)}
+
+    @staticmethod
+    def message(uid, stream, notes='data interval within range'):
+        return {'assetUid': uid, 'eventName': stream, 'notes': notes}
+
+    def test_keeps_latest(self):
+        ids = self.add_updates(self.message('A-1', 'ctdbp_no_sample'), self.message('A-1', 'adcp_engineering'),
+                               self.message('A-1', 'ctdbp_no_sample'), self.message('B-2', 'ctdbp_no_sample'),
+                               self.message('A-1', 'ctdbp_no_sample'), {'eventName': 'ctdbp_no_sample'})
+        self.assertEqual(self.coalesce(), 2)
+        # the latest per (assetUid, eventName), updates without an assetUid are left alone
+        self.assertEqual(sorted(self.remaining()), [ids[1], ids[3], ids[4], ids[5]])
+
+        self.assertEqual(self.coalesce(), 0)
+
+    def test_chunked_delete(self):
+        self.add_updates(*[self.message('A-1', 'ctdbp_no_sample') for _ in range(2500)])
+        del self.statements[:]
+        self.assertEqual(self.coalesce(), 2499)
+        self.assertEqual(len(self.remaining()), 1)
+        deletes = [statement for statement in self.statements if statement.lstrip().upper().startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+
+    def test_summary_counts_carry_forward(self):
+        self.add_updates(*[self.message('A-1', 'ctdbp_no_sample') for _ in range(3)])
+        self.assertEqual(self.coalesce(summarize=True), 2)
+        self.assertEqual(list(self.remaining().values())[0]['notes'],
+                         'data interval within range (2 superseded updates)')
+
+        # a later pass adds to the count of the update it supersedes rather than stacking notes
+        self.add_updates(*[self.message('A-1', 'ctdbp_no_sample', 'data interval threshold exceeded')
+                           for _ in range(2)])
+        self.assertEqual(self.coalesce(summarize=True), 2)
+        self.assertEqual(list(self.remaining().values())[0]['notes'],
+                         'data interval threshold exceeded (4 superseded updates)')
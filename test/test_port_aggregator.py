@@ -0,0 +1,55 @@
+import datetime
+import unittest
+
+from ooi_status.port_aggregator import PortCountAggregator
+
+
+class PortCountAggregatorTest(unittest.TestCase):
+    def setUp(self):
+        self.aggregator = PortCountAggregator(60, grace_seconds=30)
+        self.start = datetime.datetime(2017, 2, 1, 12, 0)
+
+    def test_sums_per_refdes_and_bucket(self):
+        for second in range(0, 120, 10):
+            self.aggregator.add('A', self.start + datetime.timedelta(seconds=second), 100, 10)
+        self.aggregator.add('B', self.start + datetime.timedelta(seconds=5), 50, 5)
+        self.aggregator.add('B', self.start + datetime.timedelta(minutes=3), 50, 5)
+
+        closed = self.aggregator.pop_closed(now=self.start + datetime.timedelta(minutes=5))
+        self.assertEqual(closed, [
+            ('A', self.start, 600, 60),
+            ('B', self.start, 50, 5),
+            ('A', self.start + datetime.timedelta(minutes=1), 600, 60),
+        ])
+        self.assertEqual(len(self.aggregator), 1)
+
+    def test_open_buckets_are_held(self):
+        key = self.aggregator.add('A', self.start + datetime.timedelta(seconds=15), 100, 10)
+        self.assertEqual(key, ('A', self.start))
+
+        # bucket ends at 12:01, grace period extends to 12:01:30
+        self.aggregator.add('B', self.start + datetime.timedelta(seconds=89), 100, 10)
+        self.assertEqual(self.aggregator.pop_closed(now=self.start + datetime.timedelta(minutes=5)), [])
+        self.assertTrue(self.aggregator.is_open(key))
+
+        self.aggregator.add('B', self.start + datetime.timedelta(seconds=90), 100, 10)
+        closed = self.aggregator.pop_closed(now=self.start + datetime.timedelta(minutes=5))
+        self.assertEqual(closed, [('A', self.start, 100, 10)])
+        self.assertFalse(self.aggregator.is_open(key))
+
+    def test_closes_by_message_time(self):
+        # working through a backlog of old messages must not close their buckets early
+        key = self.aggregator.add('A', self.start, 100, 10)
+        self.assertEqual(self.aggregator.pop_closed(now=self.start + datetime.timedelta(days=1)), [])
+        self.assertTrue(self.aggregator.is_open(key))
+
+    def test_future_message_time_is_capped(self):
+        # a message from a fast clock doesn't close buckets ahead of the current time
+        key = self.aggregator.add('A', self.start, 100, 10)
+        self.aggregator.add('B', self.start + datetime.timedelta(hours=1), 100, 10)
+        self.assertEqual(self.aggregator.pop_closed(now=self.start + datetime.timedelta(seconds=60)), [])
+        self.assertTrue(self.aggregator.is_open(key))
+
+    def test_force(self):
+        self.aggregator.add('A', self.start, 100, 10)
+        self.assertEqual(self.aggregator.pop_closed(now=self.start, force=True), [('A', self.start, 100, 10)])
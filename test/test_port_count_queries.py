@@ -0,0 +1,111 @@
+import datetime
+import unittest
+from collections import defaultdict
+
+from ooi_data.postgres import model
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy_utils import database_exists, create_database
+
+from ooi_status.queries import downsample_port_counts, truncate_time
+from ooi_status.status_monitor import StatusMonitor
+
+MONITOR_URL = 'postgresql+psycopg2://monitor@localhost/monitor_test'
+# (resolution, age in hours), as PORT_COUNT_TIERS
+TIERS = [('minute', 24), ('hour', 24 * 7), ('day', 24 * 90)]
+
+
+class DownsamplePortCountTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine(MONITOR_URL)
+
+        if not database_exists(cls.engine.url):
+            create_database(cls.engine.url, template='template_postgis')
+
+        model.create_database(cls.engine, drop=True)
+        cls.session = sessionmaker(bind=cls.engine)()
+        cls.monitor = StatusMonitor({'MONITOR_URL': MONITOR_URL, 'METADATA_URL': MONITOR_URL,
+                                     'PORT_COUNT_TIERS': TIERS, 'PORT_COUNT_RETENTION_DAYS': None})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.session.close()
+
+    def setUp(self):
+        self.session.query(model.PortCount).delete()
+        self.session.commit()
+
+    @staticmethod
+    def resolution(now, collected):
+        """
+        :return: the unit a record collected at this time is rolled up to, or None if it is kept as is
+        """
+        age = now - collected
+        unit = None
+        for tier_unit, hours in TIERS:
+            if age > datetime.timedelta(hours=hours):
+                unit = tier_unit
+        return unit
+
+    def add_counts(self, now):
+        """
+        Add raw port counts for two reference designators in every tier, well clear of the tier boundaries
+        :return: dictionary of (refdes id, rolled up collected time) -> [byte count, seconds]
+        """
+        times = [now - datetime.timedelta(hours=1), now - datetime.timedelta(hours=1, seconds=-10)]
+        minute = truncate_time(now - datetime.timedelta(hours=30), 'minute')
+        times.extend(minute + datetime.timedelta(seconds=s) for s in (5, 20, 40, 65))
+        hour = truncate_time(now - datetime.timedelta(hours=200), 'hour')
+        times.extend(hour + datetime.timedelta(minutes=m) for m in (5, 30, 70))
+        day = truncate_time(now - datetime.timedelta(days=100), 'day')
+        times.extend(day + datetime.timedelta(hours=h) for h in (1, 5, 30))
+
+        expected = defaultdict(lambda: [0, 0])
+        for name, byte_count in (('CE04OSBP-LJ01C-06-CTDBPO108', 100), ('RS03AXPS-PC03A-06-VADCPA301', 7)):
+            refdes = model.ReferenceDesignator.get_or_create(self.session, name)
+            self.session.flush()
+            for index, collected in enumerate(times):
+                self.session.add(model.PortCount(reference_designator_id=refdes.id, collected_time=collected,
+                                                 byte_count=byte_count * (index + 1), seconds=10))
+                unit = self.resolution(now, collected)
+                totals = expected[(refdes.id, truncate_time(collected, unit) if unit else collected)]
+                totals[0] += byte_count * (index + 1)
+                totals[1] += 10
+        self.session.commit()
+        return expected
+
+    def get_counts(self):
+        self.session.expire_all()
+        counts = defaultdict(lambda: [0, 0])
+        for port_count in self.session.query(model.PortCount):
+            totals = counts[(port_count.reference_designator_id, port_count.collected_time)]
+            totals[0] += port_count.byte_count
+            totals[1] += port_count.seconds
+        return counts
+
+    def get_ids(self):
+        self.session.expire_all()
+        return {port_count_id for port_count_id, in self.session.query(model.PortCount.id)}
+
+    def test_downsample_preserves_sums(self):
+        expected = self.add_counts(datetime.datetime.utcnow())
+        self.monitor.downsample_port_counts()
+        self.assertEqual(self.get_counts(), expected)
+        # one record per reference designator per rolled up bucket, the two recent raw records are untouched
+        self.assertEqual(len(self.get_ids()), len(expected))
+
+    def test_rerun_is_noop(self):
+        now = datetime.datetime.utcnow()
+        expected = self.add_counts(now)
+        self.monitor.downsample_port_counts()
+        ids = self.get_ids()
+
+        self.monitor.downsample_port_counts()
+        self.assertEqual(self.get_ids(), ids)
+        self.assertEqual(self.get_counts(), expected)
+
+        for unit, hours in TIERS:
+            stop = truncate_time(now - datetime.timedelta(hours=hours), unit)
+            self.assertEqual(downsample_port_counts(self.session, unit, None, stop), 0)
+        self.session.commit()
@@ -0,0 +1,88 @@
+import datetime
+import unittest
+from collections import Counter
+
+import pandas as pd
+from ooi_data.postgres.model import ReferenceDesignator, StatusEnum
+from sqlalchemy.dialects import postgresql
+
+from ooi_status.queries import (_rollup_status_query, _rollup_status_counts, diff_expected_streams, escape_like,
+                                match_filter, split_superseded_note, truncate_time)
+
+
+class RollupStatusTest(unittest.TestCase):
+    def test_counts_match_query(self):
+        rows = [(StatusEnum.OPERATIONAL,), (StatusEnum.FAILED,), (StatusEnum.OPERATIONAL,), (StatusEnum.NOT_TRACKED,)]
+        counts = Counter({StatusEnum.OPERATIONAL: 2, StatusEnum.FAILED: 1, StatusEnum.NOT_TRACKED: 1})
+        self.assertEqual(_rollup_status_query(rows), _rollup_status_counts(counts))
+        self.assertEqual(_rollup_status_counts(counts)[0], StatusEnum.FAILED)
+
+    def test_no_streams(self):
+        self.assertEqual(_rollup_status_query([]), _rollup_status_counts(Counter()))
+
+
+class TruncateTimeTest(unittest.TestCase):
+    def test_truncate_time(self):
+        dt = datetime.datetime(2017, 2, 1, 12, 34, 56, 789)
+        self.assertEqual(truncate_time(dt, 'minute'), datetime.datetime(2017, 2, 1, 12, 34))
+        self.assertEqual(truncate_time(dt, 'hour'), datetime.datetime(2017, 2, 1, 12))
+        self.assertEqual(truncate_time(dt, 'day'), datetime.datetime(2017, 2, 1))
+
+
+class SupersededNoteTest(unittest.TestCase):
+    def test_split(self):
+        self.assertEqual(split_superseded_note(None), ('', 0))
+        self.assertEqual(split_superseded_note('data interval within range'), ('data interval within range', 0))
+        self.assertEqual(split_superseded_note('data interval within range (12 superseded updates)'),
+                         ('data interval within range', 12))
+        self.assertEqual(split_superseded_note(' (3 superseded updates)'), ('', 3))
+
+
+class DiffExpectedStreamsTest(unittest.TestCase):
+    columns = ['name', 'method', 'expected_rate', 'warn_interval', 'fail_interval']
+
+    def test_diff(self):
+        current = pd.DataFrame([('ctdbp', 'streamed', 1, 60, 600),
+                                ('flort', 'streamed', 1, 60, 600),
+                                ('optaa', 'streamed', 0, 0, 0)], columns=self.columns)
+        incoming = pd.DataFrame([('ctdbp', 'streamed', 1, 60, 600),
+                                 ('flort', 'streamed', 1, 120, 600),
+                                 ('ctdbp', 'telemetered', 0, 3600, 7200),
+                                 ('optaa', 'streamed', 1, 60, 600),
+                                 ('optaa', 'streamed', 0, 0, 0)], columns=self.columns)
+        inserts, updates, unchanged = diff_expected_streams(current, incoming)
+        self.assertEqual(list(inserts.itertuples(index=False)), [('ctdbp', 'telemetered', 0, 3600, 7200)])
+        self.assertEqual(list(updates.itertuples(index=False)), [('flort', 'streamed', 1, 120, 600)])
+        self.assertEqual(unchanged, 2)
+
+    def test_empty_table(self):
+        current = pd.DataFrame([], columns=self.columns)
+        incoming = pd.DataFrame([('ctdbp', 'streamed', 1, 60, 600)], columns=self.columns)
+        inserts, updates, unchanged = diff_expected_streams(current, incoming)
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(len(updates), 0)
+        self.assertEqual(unchanged, 0)
+
+
+class MatchFilterTest(unittest.TestCase):
+    def compile(self, clause):
+        compiled = clause.compile(dialect=postgresql.dialect())
+        return str(compiled), list(compiled.params.values())
+
+    def test_escape_like(self):
+        self.assertEqual(escape_like('CTD_50%'), 'CTD\\_50\\%')
+        self.assertEqual(escape_like('a\\b'), 'a\\\\b')
+
+    def test_modes(self):
+        sql, params = self.compile(match_filter(ReferenceDesignator.name, 'RS03AXPS', 'exact'))
+        self.assertIn('=', sql)
+        self.assertEqual(params, ['RS03AXPS'])
+
+        sql, params = self.compile(match_filter(ReferenceDesignator.name, 'RS03AXPS-PC03A', 'prefix'))
+        self.assertIn('LIKE', sql)
+        self.assertEqual(params, ['RS03AXPS-PC03A%'])
+
+        sql, params = self.compile(match_filter(ReferenceDesignator.name, 'CTD_', 'substring'))
+        self.assertEqual(params, ['%CTD\\_%'])
+
+        self.assertRaises(ValueError, match_filter, ReferenceDesignator.name, 'x', 'regex')
@@ -0,0 +1,76 @@
+import unittest
+
+from ooi_data.postgres import model
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy_utils import database_exists, create_database
+
+from ooi_status.refdes_cache import ReferenceDesignatorCache
+
+
+class ReferenceDesignatorCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine('postgresql+psycopg2://monitor@localhost/monitor_test')
+
+        if not database_exists(cls.engine.url):
+            create_database(cls.engine.url, template='template_postgis')
+
+        model.create_database(cls.engine, drop=True)
+        cls.session = sessionmaker(bind=cls.engine)()
+
+        cls.statements = []
+        event.listen(cls.engine, 'before_cursor_execute', cls.count_statement)
+
+    @classmethod
+    def tearDownClass(cls):
+        event.remove(cls.engine, 'before_cursor_execute', cls.count_statement)
+        cls.session.close()
+
+    @classmethod
+    def count_statement(cls, conn, cursor, statement, parameters, context, executemany):
+        cls.statements.append(statement)
+
+    def count_queries(self, func, *args):
+        del self.statements[:]
+        result = func(*args)
+        self.session.commit()
+        return result, len(self.statements)
+
+    def test_get_ids(self):
+        existing = model.ReferenceDesignator(name='CACHE-EXISTING-01')
+        self.session.add(existing)
+        self.session.commit()
+
+        cache = ReferenceDesignatorCache()
+        names = ['CACHE-EXISTING-01', 'CACHE-NEW-01', 'CACHE-NEW-02']
+        ids, queries = self.count_queries(cache.get_ids, self.session, names)
+        # the warm load and a single insert for both new names
+        self.assertEqual(queries, 2)
+        self.assertEqual(ids['CACHE-EXISTING-01'], existing.id)
+
+        stored = dict(self.session.query(model.ReferenceDesignator.name, model.ReferenceDesignator.id)
+                      .filter(model.ReferenceDesignator.name.in_(names)))
+        self.assertEqual(ids, stored)
+
+        # every name is now cached
+        again, queries = self.count_queries(cache.get_ids, self.session, names)
+        self.assertEqual(queries, 0)
+        self.assertEqual(again, ids)
+
+        # invalidating reloads the table, the ids are unchanged
+        cache.invalidate()
+        reloaded, queries = self.count_queries(cache.get_ids, self.session, names)
+        self.assertEqual(queries, 1)
+        self.assertEqual(reloaded, ids)
+
+    def test_created_by_another_cache(self):
+        first = ReferenceDesignatorCache()
+        second = ReferenceDesignatorCache()
+        second.load(self.session)
+        created = first.get_id(self.session, 'CACHE-CONCURRENT-01')
+        self.session.commit()
+
+        # the insert returns nothing for a name which already exists, it is fetched instead
+        self.assertEqual(second.get_id(self.session, 'CACHE-CONCURRENT-01'), created)
+        self.session.commit()
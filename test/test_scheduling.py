@@ -0,0 +1,41 @@
+import datetime
+import unittest
+
+import pytz
+
+from ooi_status.scheduling import AdaptiveInterval, epoch_seconds
+
+
+class AdaptiveIntervalTest(unittest.TestCase):
+    def test_stretch_after_consecutive_overruns(self):
+        adaptive = AdaptiveInterval(60, overrun_limit=3, max_period=600)
+        self.assertIsNone(adaptive.update(90))
+        self.assertIsNone(adaptive.update(90))
+        self.assertEqual(adaptive.update(100), 180)
+        self.assertEqual(adaptive.current, 180)
+
+    def test_overruns_must_be_consecutive(self):
+        adaptive = AdaptiveInterval(60, overrun_limit=2)
+        self.assertIsNone(adaptive.update(90))
+        self.assertIsNone(adaptive.update(30))
+        self.assertIsNone(adaptive.update(90))
+        self.assertEqual(adaptive.current, 60)
+
+    def test_max_period(self):
+        adaptive = AdaptiveInterval(60, overrun_limit=1, max_period=300)
+        self.assertEqual(adaptive.update(1000), 300)
+        self.assertIsNone(adaptive.update(1000))
+
+    def test_recover(self):
+        adaptive = AdaptiveInterval(60, overrun_limit=2)
+        adaptive.update(200)
+        self.assertEqual(adaptive.update(200), 300)
+        self.assertIsNone(adaptive.update(20))
+        self.assertEqual(adaptive.update(20), 60)
+        self.assertIsNone(adaptive.update(20))
+
+
+class EpochSecondsTest(unittest.TestCase):
+    def test_epoch_seconds(self):
+        dt = datetime.datetime(2017, 1, 1, 0, 0, 1, 500000, tzinfo=pytz.utc)
+        self.assertEqual(epoch_seconds(dt), 1483228801.5)
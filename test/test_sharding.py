@@ -0,0 +1,27 @@
+import unittest
+from collections import Counter
+
+from ooi_status.sharding import fair_share, shard_for
+
+
+class ShardingTest(unittest.TestCase):
+    def test_shard_for(self):
+        refdes = ['CE01ISSM-MFD35-04-ADCPTM000', 'RS03AXPS-PC03A-4A-CTDPFA303', 'GP03FLMB-RIM01-02-CTDMOG060']
+        for name in refdes:
+            shard = shard_for(name, 64)
+            self.assertTrue(0 <= shard < 64)
+            self.assertEqual(shard, shard_for(name, 64))
+        self.assertEqual(shard_for(u'CE01ISSM-MFD35-04-ADCPTM000', 64), shard_for('CE01ISSM-MFD35-04-ADCPTM000', 64))
+
+    def test_shard_distribution(self):
+        counts = Counter(shard_for('REFDES-%05d' % i, 16) for i in range(1600))
+        self.assertEqual(len(counts), 16)
+        self.assertTrue(min(counts.values()) > 50)
+
+    def test_fair_share(self):
+        self.assertEqual(fair_share(64, 1), 64)
+        self.assertEqual(fair_share(64, 3), 22)
+        self.assertEqual(fair_share(64, 64), 1)
+        self.assertEqual(fair_share(64, 0), 64)
+        for members in range(1, 20):
+            self.assertTrue(fair_share(64, members) * members >= 64)
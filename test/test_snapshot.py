@@ -0,0 +1,55 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from collections import namedtuple
+
+from ooi_status.active_streams import ActiveStreamTable
+from ooi_status.snapshot import read_snapshot, write_snapshot
+from ooi_status.transition_scheduler import TransitionScheduler
+
+StreamMetadatum = namedtuple('StreamMetadatum', 'refdes stream method last')
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'monitor.snapshot')
+        self.now = datetime.datetime(2017, 2, 1, 12, 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        table = ActiveStreamTable()
+        ctd = StreamMetadatum('CE04OSBP-LJ01C-06-CTDBPO108', 'ctdbp_no_sample', 'streamed', self.now)
+        table.update([(ctd, None, 'uid1')], full=True)
+        transitions = TransitionScheduler()
+        key = ActiveStreamTable.key(ctd)
+        transitions.schedule(key, self.now + datetime.timedelta(minutes=5))
+
+        write_snapshot(self.path, {'active': table.dump(), 'deadlines': transitions.dump()})
+        self.assertEqual(os.listdir(self.directory), ['monitor.snapshot'])
+
+        state = read_snapshot(self.path, max_age=60)
+        restored = ActiveStreamTable()
+        restored.restore(*state['active'])
+        self.assertEqual(restored.streams, table.streams)
+        self.assertEqual(restored.since(), table.since())
+
+        restored_transitions = TransitionScheduler()
+        restored_transitions.restore(state['deadlines'])
+        self.assertEqual(restored_transitions.pop_due(self.now), set())
+        self.assertEqual(restored_transitions.pop_due(self.now + datetime.timedelta(minutes=5)), {key})
+
+    def test_missing_or_corrupt(self):
+        self.assertIsNone(read_snapshot(self.path))
+        with open(self.path, 'wb') as fh:
+            fh.write(b'not a snapshot')
+        self.assertIsNone(read_snapshot(self.path))
+
+    def test_max_age(self):
+        write_snapshot(self.path, {})
+        self.assertIsNotNone(read_snapshot(self.path, max_age=60))
+        self.assertIsNone(read_snapshot(self.path, max_age=-1))
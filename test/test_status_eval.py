@@ -0,0 +1,16 @@
+import unittest
+
+from ooi_data.postgres.model import StatusEnum
+
+from ooi_status.status_eval import evaluate_statuses
+
+
+class EvaluateStatusesTest(unittest.TestCase):
+    def test_evaluate_statuses(self):
+        elapsed = [10, 200, 700, 5]
+        warn = [120, 120, 120, 0]
+        fail = [600, 600, 600, 0]
+        statuses, intervals = evaluate_statuses(elapsed, warn, fail)
+        self.assertEqual(list(statuses), [StatusEnum.OPERATIONAL, StatusEnum.DEGRADED,
+                                          StatusEnum.FAILED, StatusEnum.NOT_TRACKED])
+        self.assertEqual(list(intervals), [120, 120, 600, None])
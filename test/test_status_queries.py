@@ -0,0 +1,70 @@
+import datetime
+import unittest
+
+from ooi_data.postgres import model
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy_utils import database_exists, create_database
+
+from ooi_status.queries import get_status_by_instrument, get_status_by_stream, get_status_query
+
+
+class StatusQueryCountTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine('postgresql+psycopg2://monitor@localhost/monitor_test')
+
+        if not database_exists(cls.engine.url):
+            create_database(cls.engine.url, template='template_postgis')
+
+        model.create_database(cls.engine, drop=True)
+        cls.session = sessionmaker(bind=cls.engine)()
+
+        cls.statements = []
+        event.listen(cls.engine, 'before_cursor_execute', cls.count_statement)
+
+    @classmethod
+    def tearDownClass(cls):
+        event.remove(cls.engine, 'before_cursor_execute', cls.count_statement)
+        cls.session.close()
+
+    @classmethod
+    def count_statement(cls, conn, cursor, statement, parameters, context, executemany):
+        cls.statements.append(statement)
+
+    def add_streams(self, prefix, count):
+        now = datetime.datetime.utcnow()
+        for index in range(count):
+            refdes = model.ReferenceDesignator(name='%s-%05d' % (prefix, index))
+            expected = model.ExpectedStream(name='%s_stream_%d' % (prefix.lower(), index), method='streamed',
+                                            expected_rate=1, warn_interval=60, fail_interval=600)
+            self.session.add(model.DeployedStream(reference_designator=refdes, expected_stream=expected,
+                                                  status=model.StatusEnum.OPERATIONAL, status_time=now))
+        self.session.commit()
+
+    def count_queries(self, func, **kwargs):
+        self.session.expire_all()
+        del self.statements[:]
+        result = func(self.session, **kwargs)
+        return result, len(self.statements)
+
+    def test_constant_query_count(self):
+        self.add_streams('SMALL', 2)
+        self.add_streams('LARGE', 50)
+
+        small, small_queries = self.count_queries(get_status_by_instrument, filter_refdes='SMALL')
+        large, large_queries = self.count_queries(get_status_by_instrument, filter_refdes='LARGE')
+        self.assertEqual((len(small), len(large)), (2, 50))
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(large_queries, 1)
+
+        _, stream_queries = self.count_queries(get_status_by_stream, filter_refdes='LARGE')
+        self.assertEqual(stream_queries, 1)
+        _, page_queries = self.count_queries(get_status_by_stream, filter_refdes='LARGE', limit=10)
+        self.assertEqual(page_queries, 1)
+
+    def test_matches_as_dict(self):
+        self.add_streams('MATCH', 3)
+        expected = {ds.id: ds.as_dict() for ds in get_status_query(self.session, filter_refdes='MATCH')}
+        rows = get_status_by_stream(self.session, filter_refdes='MATCH')['status']
+        self.assertEqual({row['id']: row for row in rows}, expected)
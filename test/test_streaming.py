@@ -0,0 +1,42 @@
+import datetime
+import json
+import unittest
+
+from flask import Flask
+
+from ooi_status.api import StatusJsonEncoder
+from ooi_status.api.streaming import CHUNK_SIZE, buffered, iterencode_object, streamed_json
+
+
+class StreamingTest(unittest.TestCase):
+    def setUp(self):
+        self.encoder = StatusJsonEncoder(separators=(',', ':'))
+
+    def encode(self, fields):
+        return ''.join(buffered(iterencode_object(fields, self.encoder)))
+
+    def test_matches_json(self):
+        now = datetime.datetime(2017, 2, 1, 12, 0, 0, 123)
+        items = [{'measure': 'Deployments', 'data': [(now, 'Deployment: 1', now)]}, {'measure': 'streamed ctd'}]
+        text = self.encode([('availability', (item for item in items)), ('count', 2)])
+        self.assertEqual(json.loads(text), {'availability': json.loads(self.encoder.encode(items)), 'count': 2})
+        self.assertEqual(json.loads(self.encode([('empty', (i for i in []))])), {'empty': []})
+
+    def test_first_item_sent_immediately(self):
+        items = ({'index': index, 'padding': 'x' * 100} for index in range(1000))
+        chunks = list(buffered(iterencode_object([('items', items)], self.encoder)))
+        self.assertEqual(json.loads(chunks[0] + ']}'), {'items': [{'index': 0, 'padding': 'x' * 100}]})
+        self.assertTrue(all(len(chunk) >= CHUNK_SIZE for chunk in chunks[1:-1]))
+        self.assertEqual(len(json.loads(''.join(chunks))['items']), 1000)
+
+    def test_response(self):
+        app = Flask(__name__)
+        app.json_encoder = StatusJsonEncoder
+
+        @app.route('/items')
+        def items():
+            return streamed_json(app, [('items', (i for i in range(3)))])
+
+        response = app.test_client().get('/items')
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(json.loads(response.get_data(as_text=True)), {'items': [0, 1, 2]})
@@ -0,0 +1,35 @@
+import datetime
+import unittest
+
+from ooi_status.transition_scheduler import TransitionScheduler
+
+
+class TransitionSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = TransitionScheduler()
+        self.last = datetime.datetime(2017, 2, 1, 12, 0)
+
+    def deadline(self, elapsed_seconds, warn, fail):
+        return self.scheduler.next_deadline(self.last, datetime.timedelta(seconds=elapsed_seconds), warn, fail)
+
+    def test_next_deadline(self):
+        self.assertEqual(self.deadline(10, 120, 600), self.last + datetime.timedelta(seconds=120))
+        self.assertEqual(self.deadline(300, 120, 600), self.last + datetime.timedelta(seconds=600))
+        self.assertIsNone(self.deadline(900, 120, 600))
+        # not tracked
+        self.assertIsNone(self.deadline(10, 0, 0))
+        self.assertEqual(self.deadline(10, 0, 600), self.last + datetime.timedelta(seconds=600))
+
+    def test_pop_due(self):
+        self.scheduler.schedule('a', self.last + datetime.timedelta(seconds=60))
+        self.scheduler.schedule('b', self.last + datetime.timedelta(seconds=120))
+        self.assertEqual(self.scheduler.pop_due(self.last), set())
+        self.assertEqual(self.scheduler.pop_due(self.last + datetime.timedelta(seconds=60)), {'a'})
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_reschedule(self):
+        self.scheduler.schedule('a', self.last + datetime.timedelta(seconds=60))
+        self.scheduler.schedule('a', self.last + datetime.timedelta(seconds=600))
+        self.assertEqual(self.scheduler.pop_due(self.last + datetime.timedelta(seconds=300)), set())
+        self.scheduler.schedule('a', None)
+        self.assertEqual(self.scheduler.pop_due(self.last + datetime.timedelta(days=1)), set())